@@ -138,6 +138,14 @@ async def startup_event():
         except Exception as e:
             print(f"⚠️ Auto-configuration failed: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the trade manager and close pooled OANDA connections on shutdown"""
+    if trade_manager is not None:
+        await trade_manager.close()
+    if oanda_client is not None:
+        await oanda_client.close()
+
 @app.get("/")
 async def root():
     return {"message": "Smart Structure Trading Bot API", "status": "running"}
@@ -155,7 +163,13 @@ async def configure_bot_internal(config: BotConfig):
     global oanda_client, risk_manager, structure_detector, order_executor
     global data_module, news_filter, signal_generator, trade_manager
     
-    # Initialize OANDA client
+    # Shut down the previous trade manager (its tasks, DB thread and connection)
+    if trade_manager is not None:
+        await trade_manager.close()
+    
+    # Initialize OANDA client (closing the previous one's pooled connections)
+    if oanda_client is not None:
+        await oanda_client.close()
     oanda_client = OandaClient(
         api_key=config.api_key,
         account_id=config.account_id,
@@ -422,8 +436,11 @@ async def run_trading_bot():
     """Main trading bot loop - runs in background"""
     global bot_running
     
+    # Enforce line chart mode once per bot run rather than per signal pass
+    LINE_CHART_CONFIG.LINE_CHART_MODE = True
+    
     print("🤖 Trading bot started")
-    print(f"📊 Line Chart Mode: {LINE_CHART_CONFIG.is_line_chart_mode()}")
+    print(f"📊 Line Chart Mode: {LINE_CHART_CONFIG.is_line_chart_mode()} (closing prices only)")
     print(f"⚡ Auto Execute Trades: {LINE_CHART_CONFIG.should_auto_execute()}")
     
     while bot_running:
@@ -456,7 +473,7 @@ async def run_trading_bot():
                     else:
                         # Fallback to direct structure detector
                         candles = await data_module.get_real_time_data(instrument, 500)
-                        if candles:
+                        if candles is not None and len(candles.close) > 0:
                             signals = structure_detector.analyze(instrument, candles)
                     
                     print(f"📊 Found {len(signals)} signals for {instrument}")
@@ -477,11 +494,13 @@ async def run_trading_bot():
                         break
                     
                     # FORCE TRADE EXECUTION
-                    print(f"🎯 EXECUTING TRADE: {signal['setup_type']} {signal['direction']} on {signal['instrument']}")
+                    print(f"🎯 EXECUTING TRADE: {signal.setup_type} {signal.direction} on {signal.instrument}")
                     result = await order_executor.execute_signal(signal)
                     
                     if result['success']:
                         print(f"✅ TRADE EXECUTED: {result['message']}")
+                        if trade_manager:
+                            trade_manager.notify_trade_opened()
                     else:
                         print(f"❌ TRADE FAILED: {result['reason']}")
                     
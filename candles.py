@@ -0,0 +1,75 @@
+"""
+Candle Arrays Module
+Columnar (structure-of-arrays) candle storage shared by the data and structure modules
+"""
+
+from collections import namedtuple
+from typing import Dict, List
+import numpy as np
+
+# One NumPy array per field; index i across all arrays is candle i.
+# time is datetime64[ns] (UTC), prices are float64
+Candles = namedtuple('Candles', 'time open high low close')
+
+
+def _to_datetime64(times) -> np.ndarray:
+    """Convert OANDA RFC3339 times ('...Z', always UTC) to a naive UTC datetime64[ns] array"""
+    return np.array(
+        [t[:-1] if isinstance(t, str) and t.endswith('Z') else t for t in times],
+        dtype='datetime64[ns]'
+    )
+
+
+def candles_from_oanda(raw_candles: List[Dict]) -> Candles:
+    """
+    Build Candles arrays straight from OANDA's candle JSON
+
+    Args:
+        raw_candles: 'candles' list from the OANDA instruments/candles response
+
+    Returns:
+        Candles with completed candles only
+    """
+    times = []
+    opens = []
+    highs = []
+    lows = []
+    closes = []
+
+    for candle in raw_candles:
+        if candle['complete']:  # Only use completed candles
+            mid = candle['mid']
+            times.append(candle['time'])
+            opens.append(mid['o'])
+            highs.append(mid['h'])
+            lows.append(mid['l'])
+            closes.append(mid['c'])
+
+    return Candles(
+        time=_to_datetime64(times),
+        open=np.array(opens, dtype=np.float64),
+        high=np.array(highs, dtype=np.float64),
+        low=np.array(lows, dtype=np.float64),
+        close=np.array(closes, dtype=np.float64)
+    )
+
+
+def candles_from_dicts(candle_dicts: List[Dict]) -> Candles:
+    """
+    Convert legacy list-of-dict candles (as from OandaClient.get_candles) to Candles
+
+    Args:
+        candle_dicts: Candles with 'time', 'open', 'high', 'low', 'close' keys
+
+    Returns:
+        Candles with one array per field
+    """
+    count = len(candle_dicts)
+
+    return Candles(
+        time=_to_datetime64([c['time'] for c in candle_dicts]),
+        open=np.fromiter((c['open'] for c in candle_dicts), dtype=np.float64, count=count),
+        high=np.fromiter((c['high'] for c in candle_dicts), dtype=np.float64, count=count),
+        low=np.fromiter((c['low'] for c in candle_dicts), dtype=np.float64, count=count),
+        close=np.fromiter((c['close'] for c in candle_dicts), dtype=np.float64, count=count)
+    )
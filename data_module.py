@@ -6,14 +6,16 @@ Handles real-time data fetching and previous day level calculations
 import asyncio
 from datetime import datetime, timedelta, time
 from typing import Dict, List, Optional
-import pytz
+from zoneinfo import ZoneInfo
+import numpy as np
+from candles import Candles
 
 class DataModule:
     def __init__(self, oanda_client, db):
         self.oanda_client = oanda_client
         self.db = db
         self.instruments = ["NAS100_USD", "EU50_EUR", "JP225_USD", "USD_CAD", "USD_JPY"]
-        self.broker_timezone = pytz.timezone('America/New_York')  # OANDA uses NY time
+        self.broker_timezone = ZoneInfo('America/New_York')  # OANDA uses NY time
         self.last_daily_reset = None
         
     async def initialize_daily_levels(self):
@@ -108,25 +110,14 @@ class DataModule:
         except Exception as e:
             print(f"❌ Error calculating levels for {instrument}: {str(e)}")
     
-    async def get_real_time_data(self, instrument: str, count: int = 500) -> List[Dict]:
-        """Get real-time 5-minute data for LINE CHART ONLY analysis"""
+    async def get_real_time_data(self, instrument: str, count: int = 500) -> Optional[Candles]:
+        """Get real-time 5-minute data as columnar arrays for LINE CHART analysis"""
         try:
-            candles = await self.oanda_client.get_candles(instrument, "M5", count)
-            
-            # Return ONLY closing prices for line chart analysis
-            processed_data = []
-            for candle in candles:
-                processed_data.append({
-                    'time': candle['time'],
-                    'close': candle['close'],  # ONLY closing price for line chart
-                    'volume': candle['volume']
-                })
-            
-            return processed_data
+            return await self.oanda_client.get_candle_arrays(instrument, "M5", count)
             
         except Exception as e:
             print(f"❌ Error fetching real-time data for {instrument}: {str(e)}")
-            return []
+            return None
     
     async def get_previous_day_levels(self, instrument: str) -> Optional[Dict]:
         """Get previous day levels for an instrument"""
@@ -173,20 +164,16 @@ class DataModule:
         else:
             return "QUIET"
     
-    async def validate_data_quality(self, candles: List[Dict]) -> bool:
+    async def validate_data_quality(self, candles: Optional[Candles]) -> bool:
         """Validate data quality for trading decisions"""
-        if not candles or len(candles) < 10:
+        if candles is None or len(candles.close) < 10:
             return False
         
-        # Check for gaps in data
-        for i in range(1, len(candles)):
-            prev_time = datetime.fromisoformat(candles[i-1]['time'].replace('Z', '+00:00'))
-            curr_time = datetime.fromisoformat(candles[i]['time'].replace('Z', '+00:00'))
-            
-            # Should be 5 minutes apart
-            time_diff = (curr_time - prev_time).total_seconds()
-            if time_diff > 600:  # More than 10 minutes gap
-                print(f"⚠️ Data gap detected: {time_diff}s between candles")
-                return False
+        # Check for gaps in data (should be 5 minutes apart)
+        time_diffs = np.diff(candles.time) / np.timedelta64(1, 's')
+        gaps = np.flatnonzero(time_diffs > 600)  # More than 10 minutes gap
+        if len(gaps):
+            print(f"⚠️ Data gap detected: {time_diffs[gaps[0]]}s between candles")
+            return False
         
         return True
\ No newline at end of file
@@ -199,6 +199,23 @@ class Database:
         
         self.conn.commit()
     
+    def update_trade_prices_bulk(self, rows: List[tuple]):
+        """
+        Update current price and unrealized P&L for several trades in one transaction
+        
+        Args:
+            rows: (current_price, unrealized_pnl, trade_id) per trade
+        """
+        cursor = self.conn.cursor()
+        
+        cursor.executemany("""
+            UPDATE open_trades 
+            SET current_price = ?, unrealized_pnl = ?
+            WHERE trade_id = ?
+        """, rows)
+        
+        self.conn.commit()
+    
     def update_trade(self, trade_id: int, updates: Dict):
         """Update trade fields"""
         cursor = self.conn.cursor()
@@ -273,6 +290,42 @@ class Database:
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     
+    def get_closed_trades_summary(self, limit: int = 1000) -> Dict:
+        """Count, wins, total, best and worst P&L over the most recent closed trades"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CASE WHEN pnl > 0 THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(pnl), 0),
+                   COALESCE(MAX(pnl), 0),
+                   COALESCE(MIN(pnl), 0)
+            FROM (
+                SELECT pnl FROM closed_trades
+                ORDER BY exit_time DESC
+                LIMIT ?
+            )
+        """, (limit,))
+        
+        total_trades, winning_trades, total_pnl, best_trade, worst_trade = cursor.fetchone()
+        return {
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'total_pnl': total_pnl,
+            'best_trade': best_trade,
+            'worst_trade': worst_trade
+        }
+    
+    def get_open_trades_summary(self) -> Dict:
+        """Count and total unrealized P&L of open trades"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(unrealized_pnl), 0)
+            FROM open_trades WHERE status = 'OPEN'
+        """)
+        
+        open_trades, unrealized_pnl = cursor.fetchone()
+        return {'open_trades': open_trades, 'unrealized_pnl': unrealized_pnl}
+    
     def get_today_trades_count(self) -> int:
         """Get number of trades taken today"""
         cursor = self.conn.cursor()
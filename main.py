@@ -4,11 +4,32 @@ Smart Structure Trading Bot - Main Entry Point
 
 import os
 import sys
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Bot logging shares LOG_LEVEL with uvicorn. Hot-path analysis detail is DEBUG, so the
+# INFO default shows validated signals and trade outcomes without the per-tick noise.
+# Records are queued and written to stderr by a listener thread, so logging from
+# the event loop never blocks on the stream write
+log_queue = queue.SimpleQueue()
+log_output = logging.StreamHandler()
+log_output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+log_listener = QueueListener(log_queue, log_output)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(message)s",  # Final formatting is done by log_output
+    handlers=[QueueHandler(log_queue)]
+)
+
 # Add current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -5,8 +5,18 @@ Handles all communication with OANDA's REST API
 
 import aiohttp
 import asyncio
+import json
+import time
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+from candles import Candles, candles_from_oanda
+
+# orjson is optional - faster JSON decoding of large candle responses
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 class OandaClient:
     def __init__(self, api_key: str, account_id: str, environment: str = "practice"):
@@ -33,16 +43,39 @@ class OandaClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        
+        # Mid price per instrument with the time.monotonic() it was fetched - callers
+        # asking within price_cache_ttl seconds share one pricing request
+        self.price_cache_ttl = 2.0
+        self._price_cache = {}
+        
+        # One pooled keep-alive session for REST calls (created on first request, inside
+        # the event loop), and a cap on in-flight requests to stay under OANDA's rate limit
+        self._session = None
+        self._request_slots = asyncio.Semaphore(15)
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared REST session - reuses TCP/TLS connections across requests"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the pooled session and its connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
     
     async def _request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None):
         """Make async HTTP request to OANDA API"""
         url = f"{self.base_url}{endpoint}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.request(
+        async with self._request_slots:
+            async with self._get_session().request(
                 method=method,
                 url=url,
-                headers=self.headers,
                 params=params,
                 json=data
             ) as response:
@@ -50,7 +83,7 @@ class OandaClient:
                     text = await response.text()
                     raise Exception(f"OANDA API Error {response.status}: {text}")
                 
-                return await response.json()
+                return await response.json(loads=json_loads)
     
     async def get_account_info(self) -> Dict:
         """Get account information"""
@@ -91,18 +124,110 @@ class OandaClient:
         
         return candles
     
+    async def get_candle_arrays(self, instrument: str, granularity: str = "M3", count: int = 500) -> Candles:
+        """
+        Get historical candles as columnar NumPy arrays
+        
+        Skips building a dict per candle - used by the real-time analysis path
+        
+        Args:
+            instrument: e.g., "NAS100_USD", "USD_JPY"
+            granularity: M1, M3, M5, M15, H1, H4, D
+            count: number of candles (max 5000)
+        
+        Returns:
+            Candles namedtuple of time/open/high/low/close arrays
+        """
+        params = {
+            "granularity": granularity,
+            "count": count
+        }
+        
+        result = await self._request("GET", f"/instruments/{instrument}/candles", params=params)
+        
+        return candles_from_oanda(result['candles'])
+    
     async def get_current_price(self, instrument: str) -> float:
         """Get current bid/ask price for an instrument"""
-        result = await self._request("GET", f"/accounts/{self.account_id}/pricing", 
-                                     params={"instruments": instrument})
+        prices = await self.get_current_prices([instrument])
         
-        if result['prices']:
-            price = result['prices'][0]
-            # Return mid price (average of bid and ask)
-            return (float(price['bids'][0]['price']) + float(price['asks'][0]['price'])) / 2
+        if instrument in prices:
+            return prices[instrument]
         
         raise Exception(f"No price data for {instrument}")
     
+    async def get_current_prices(self, instruments: List[str]) -> Dict[str, float]:
+        """
+        Get current mid prices for several instruments in one pricing request
+        
+        Prices fetched less than price_cache_ttl seconds ago are served from the
+        cache; only the rest are requested.
+        
+        Returns:
+            Mid price per instrument; instruments OANDA returned no price for are omitted
+        """
+        now = time.monotonic()
+        prices = {}
+        stale = []
+        for instrument in instruments:
+            cached = self._price_cache.get(instrument)
+            if cached is not None and now - cached[1] < self.price_cache_ttl:
+                prices[instrument] = cached[0]
+            else:
+                stale.append(instrument)
+        
+        if not stale:
+            return prices
+        
+        result = await self._request("GET", f"/accounts/{self.account_id}/pricing",
+                                     params={"instruments": ",".join(stale)})
+        
+        fetched_at = time.monotonic()
+        for price in result['prices']:
+            # Mid price (average of bid and ask)
+            mid = (float(price['bids'][0]['price']) + float(price['asks'][0]['price'])) / 2
+            self._price_cache[price['instrument']] = (mid, fetched_at)
+            prices[price['instrument']] = mid
+        
+        return prices
+    
+    async def stream_prices(self, instruments: List[str]):
+        """
+        Stream live prices for instruments from the OANDA pricing stream
+        
+        Each price also refreshes the get_current_prices cache.
+        
+        Yields:
+            (instrument, bid, ask, time) per price update, or None per heartbeat
+            (about every 5 s) so consumers get control back on quiet markets
+        """
+        url = f"{self.stream_url}/accounts/{self.account_id}/pricing/stream"
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=30)
+        
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, headers=self.headers,
+                                   params={"instruments": ",".join(instruments)}) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise Exception(f"OANDA API Error {response.status}: {text}")
+                
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    
+                    message = json_loads(line)
+                    if message.get('type') == 'HEARTBEAT':
+                        yield None
+                        continue
+                    
+                    if message.get('type') != 'PRICE' or not message.get('bids') or not message.get('asks'):
+                        continue
+                    
+                    bid = float(message['bids'][0]['price'])
+                    ask = float(message['asks'][0]['price'])
+                    self._price_cache[message['instrument']] = ((bid + ask) / 2, time.monotonic())
+                    yield message['instrument'], bid, ask, message['time']
+    
     async def place_market_order(
         self,
         instrument: str,
@@ -179,6 +304,29 @@ class OandaClient:
         result = await self._request("GET", f"/accounts/{self.account_id}/trades/{trade_id}")
         return result['trade']
     
+    async def get_closed_trade(self, trade_id: str) -> Dict:
+        """
+        Get how a closed trade exited
+        
+        Returns:
+            {'price': average close price, 'reason': 'TP', 'SL' or 'BROKER'}
+        """
+        trade = await self.get_trade_details(trade_id)
+        
+        if trade.get('state') != 'CLOSED' or 'averageClosePrice' not in trade:
+            raise Exception(f"Trade {trade_id} is not closed")
+        
+        # The dependent order that filled is what closed the trade
+        if trade.get('takeProfitOrder', {}).get('state') == 'FILLED':
+            reason = 'TP'
+        elif (trade.get('stopLossOrder', {}).get('state') == 'FILLED'
+              or trade.get('trailingStopLossOrder', {}).get('state') == 'FILLED'):
+            reason = 'SL'
+        else:
+            reason = 'BROKER'
+        
+        return {'price': float(trade['averageClosePrice']), 'reason': reason}
+    
     def calculate_units(self, risk_amount: float, stop_loss_pips: float, instrument: str) -> int:
         """
         Calculate position size in units based on risk amount and stop loss
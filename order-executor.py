@@ -7,6 +7,7 @@ from typing import Dict, Optional, List
 from datetime import datetime
 import asyncio
 from line_chart_config import LINE_CHART_CONFIG
+from trade_signal import Signal
 
 class OrderExecutor:
     def __init__(self, oanda_client, risk_manager, db):
@@ -22,12 +23,12 @@ class OrderExecutor:
         self.risk_manager = risk_manager
         self.db = db
     
-    async def execute_signal(self, signal: Dict) -> Dict:
+    async def execute_signal(self, signal: Signal) -> Dict:
         """
         Execute a trading signal - FORCED EXECUTION MODE
         
         Args:
-            signal: Signal dictionary from structure detector
+            signal: Signal from structure detector
         
         Returns:
             Execution result
@@ -38,14 +39,14 @@ class OrderExecutor:
             LINE_CHART_CONFIG.AUTO_EXECUTE_TRADES = True
             LINE_CHART_CONFIG.TRADE_EXECUTION_ENABLED = True
         
-        print(f"🚀 EXECUTING TRADE: {signal.get('setup_type')} {signal.get('direction')} on {signal.get('instrument')}")
+        print(f"🚀 EXECUTING TRADE: {signal.setup_type} {signal.direction} on {signal.instrument}")
         
         try:
-            instrument = signal['instrument']
-            direction = signal['direction']
-            entry_price = signal['entry_price']
-            stop_loss = signal['stop_loss']
-            setup_type = signal['setup_type']
+            instrument = signal.instrument
+            direction = signal.direction
+            entry_price = signal.entry_price
+            stop_loss = signal.stop_loss
+            setup_type = signal.setup_type
             
             # Get current account balance
             account_info = await self.oanda_client.get_account_info()
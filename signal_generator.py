@@ -5,8 +5,13 @@ Validates CHOCH/BOS entry conditions and generates trading signals
 
 from typing import Dict, List, Optional
 from datetime import datetime
+from collections import Counter
 import asyncio
-from line_chart_config import LINE_CHART_CONFIG
+import logging
+from candles import Candles
+from trade_signal import Signal
+
+logger = logging.getLogger(__name__)
 
 class SignalGenerator:
     def __init__(self, structure_detector, data_module, news_filter, db):
@@ -15,22 +20,23 @@ class SignalGenerator:
         self.news_filter = news_filter
         self.db = db
         self.bos_distance_threshold_pips = 50  # Configurable BOS distance threshold
+        
+        # Per-instrument error counts for sampling traceback logging
+        self.error_counts = Counter()
+        self.traceback_every = 100
+        
+        # Pip size per instrument, filled on first use - covers instruments added
+        # through settings after startup
+        self.pip_size = {}
     
-    async def generate_signals(self, instrument: str) -> List[Dict]:
+    async def generate_signals(self, instrument: str) -> List[Signal]:
         """Generate trading signals for an instrument using LINE CHART strategy"""
         signals = []
         
-        # ENFORCE LINE CHART MODE
-        if not LINE_CHART_CONFIG.is_line_chart_mode():
-            print(f"⚠️ [{instrument}] FORCING LINE CHART MODE ON")
-            LINE_CHART_CONFIG.LINE_CHART_MODE = True
-        
-        print(f"📈 [{instrument}] Generating signals in LINE CHART MODE (closing prices only)")
-        
         try:
             # MANDATORY NEWS FILTER - Always check for high-impact news
             if await self.news_filter.should_pause_trading():
-                print(f"⏸️ [{instrument}] Trading paused due to high-impact news (MANDATORY)")
+                logger.debug("⏸️ [%s] Trading paused due to high-impact news (MANDATORY)", instrument)
                 return signals
             
             # Check total active trade limit (max 3 running at any time)
@@ -39,82 +45,86 @@ class SignalGenerator:
             max_concurrent_trades = config.get('daily_trade_limit', 3)
             
             if total_active_trades >= max_concurrent_trades:
-                print(f"⏸️ [{instrument}] Trade limit reached ({total_active_trades}/{max_concurrent_trades})")
+                logger.debug("⏸️ [%s] Trade limit reached (%s/%s)", instrument, total_active_trades, max_concurrent_trades)
                 return signals
             
             # Get real-time data
             candles = await self.data_module.get_real_time_data(instrument, 500)
             
-            if not candles:
-                print(f"⚠️ [{instrument}] No candle data available")
+            if candles is None or len(candles.close) == 0:
+                logger.warning("⚠️ [%s] No candle data available", instrument)
                 return signals
             
             if not await self.data_module.validate_data_quality(candles):
-                print(f"⚠️ [{instrument}] Data quality check failed")
+                logger.warning("⚠️ [%s] Data quality check failed", instrument)
                 return signals
             
             # Get previous day levels
             levels = await self.data_module.get_previous_day_levels(instrument)
             if not levels:
-                print(f"⚠️ [{instrument}] No previous day levels available")
+                logger.warning("⚠️ [%s] No previous day levels available", instrument)
                 return signals
             
             # Generate signals based on structure analysis - DIRECT CALL
             structure_signals = self.structure_detector.analyze(instrument, candles)
             
-            print(f"🔍 [{instrument}] Structure detector found {len(structure_signals)} raw signals")
+            logger.debug("🔍 [%s] Structure detector found %d raw signals", instrument, len(structure_signals))
             
             # Validate each signal
             for signal in structure_signals:
                 validated_signal = await self._validate_signal(signal, levels, candles)
                 if validated_signal:
                     signals.append(validated_signal)
-                    print(f"✅ [{instrument}] Signal validated: {signal['setup_type']} {signal['direction']}")
+                    logger.info("✅ [%s] Signal validated: %s %s", instrument, signal.setup_type, signal.direction)
                 else:
-                    print(f"❌ [{instrument}] Signal rejected: {signal['setup_type']} {signal['direction']}")
+                    logger.debug("❌ [%s] Signal rejected: %s %s", instrument, signal.setup_type, signal.direction)
             
         except Exception as e:
-            print(f"❌ Error generating signals for {instrument}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            # Full traceback only on the first and every Nth repeat per instrument
+            if self.error_counts[instrument] % self.traceback_every == 0:
+                logger.exception("❌ Error generating signals for %s: %s", instrument, e)
+            else:
+                logger.error("❌ Error generating signals for %s: %s", instrument, e)
+            self.error_counts[instrument] += 1
         
         return signals
     
-    async def _validate_signal(self, signal: Dict, levels: Dict, candles: List[Dict]) -> Optional[Dict]:
+    async def _validate_signal(self, signal: Signal, levels: Dict, candles: Candles) -> Optional[Signal]:
         """Validate a trading signal against all criteria - RELAXED FOR TESTING"""
         try:
-            setup_type = signal['setup_type']
-            direction = signal['direction']
-            entry_price = signal['entry_price']
-            stop_loss = signal['stop_loss']
+            setup_type = signal.setup_type
+            direction = signal.direction
+            entry_price = signal.entry_price
+            stop_loss = signal.stop_loss
             
             # RELAXED VALIDATION - Accept most signals
-            print(f"   Validating {setup_type} {direction} signal...")
+            logger.debug("   Validating %s %s signal...", setup_type, direction)
             
             # Basic stop loss validation (very lenient)
             if direction == 'BUY' and stop_loss >= entry_price:
-                print(f"   Invalid SL for BUY: SL={stop_loss} >= Entry={entry_price}")
+                logger.debug("   Invalid SL for BUY: SL=%s >= Entry=%s", stop_loss, entry_price)
                 return None
             elif direction == 'SELL' and stop_loss <= entry_price:
-                print(f"   Invalid SL for SELL: SL={stop_loss} <= Entry={entry_price}")
+                logger.debug("   Invalid SL for SELL: SL=%s <= Entry=%s", stop_loss, entry_price)
                 return None
             
             # Skip BOS distance validation for now
             # Skip market conditions validation for now
             
-            # Calculate take profit (1:4 RR)
-            take_profit = self._calculate_take_profit(entry_price, stop_loss, direction)
+            # Calculate take profit (1:4 RR) - SL sits on the opposite side of
+            # entry for both directions, so one expression covers BUY and SELL
+            take_profit = entry_price + (entry_price - stop_loss) * 4.0
             
             # Add validation timestamp and enforce 1:4 RR
-            signal['validated_at'] = datetime.now()
-            signal['take_profit'] = take_profit
-            signal['risk_reward_ratio'] = 4.0  # MANDATORY 1:4 Risk-Reward Ratio
+            signal.validated_at = datetime.now()
+            signal.take_profit = take_profit
+            signal.risk_reward_ratio = 4.0  # MANDATORY 1:4 Risk-Reward Ratio
             
-            print(f"   Signal validated: Entry={entry_price:.4f}, SL={stop_loss:.4f}, TP={take_profit:.4f}")
+            logger.debug("   Signal validated: Entry=%.4f, SL=%.4f, TP=%.4f", entry_price, stop_loss, take_profit)
             return signal
             
         except Exception as e:
-            print(f"Error validating signal: {str(e)}")
+            logger.error("Error validating signal: %s", e)
             return None
     
     def _validate_stop_loss(self, entry_price: float, stop_loss: float, direction: str) -> bool:
@@ -135,10 +145,18 @@ class SignalGenerator:
         
         return True
     
-    def _validate_bos_distance(self, signal: Dict, levels: Dict) -> bool:
+    def _pip_size(self, instrument: str) -> float:
+        """Pip size for an instrument (JPY pairs, other '_' pairs, indices), cached"""
+        pip_size = self.pip_size.get(instrument)
+        if pip_size is None:
+            pip_size = 0.01 if 'JPY' in instrument else 0.0001 if '_' in instrument else 1.0
+            self.pip_size[instrument] = pip_size
+        return pip_size
+    
+    def _validate_bos_distance(self, signal: Signal, levels: Dict) -> bool:
         """Validate BOS is not too far from broken level"""
-        entry_price = signal['entry_price']
-        reference_level = signal.get('reference_level')
+        entry_price = signal.entry_price
+        reference_level = signal.reference_level
         
         if not reference_level:
             return True
@@ -146,18 +164,12 @@ class SignalGenerator:
         # Calculate distance in pips
         distance = abs(entry_price - reference_level)
         
-        # Convert to pips based on instrument
-        instrument = signal['instrument']
-        if 'JPY' in instrument:
-            distance_pips = distance / 0.01
-        elif '_' in instrument:  # Forex
-            distance_pips = distance / 0.0001
-        else:  # Indices
-            distance_pips = distance / 1.0
+        # Convert to pips
+        distance_pips = distance / self._pip_size(signal.instrument)
         
         # Check if distance exceeds threshold
         if distance_pips > self.bos_distance_threshold_pips:
-            print(f"⚠️ BOS too far from level: {distance_pips:.1f} pips > {self.bos_distance_threshold_pips} pips")
+            logger.debug("⚠️ BOS too far from level: %.1f pips > %s pips", distance_pips, self.bos_distance_threshold_pips)
             return False
         
         return True
@@ -175,16 +187,6 @@ class SignalGenerator:
         
         return True
     
-    def _calculate_take_profit(self, entry_price: float, stop_loss: float, direction: str) -> float:
-        """Calculate take profit at 1:4 risk-reward ratio"""
-        sl_distance = abs(entry_price - stop_loss)
-        tp_distance = sl_distance * 4
-        
-        if direction == 'BUY':
-            return entry_price + tp_distance
-        else:  # SELL
-            return entry_price - tp_distance
-    
     def set_bos_distance_threshold(self, threshold_pips: float):
         """Set BOS distance threshold in pips"""
         self.bos_distance_threshold_pips = threshold_pips
@@ -196,31 +198,35 @@ class SignalGenerator:
             # Get recent signals from database
             recent_trades = self.db.get_closed_trades(limit=100)
             
-            total_signals = len(recent_trades)
-            choch_signals = len([t for t in recent_trades if t['setup_type'] == 'CHOCH'])
-            bos_signals = len([t for t in recent_trades if t['setup_type'] == 'BOS'])
+            # Single pass: count signals and winners per setup type
+            setup_counts = Counter()
+            setup_wins = Counter()
+            for trade in recent_trades:
+                setup_type = trade['setup_type']
+                setup_counts[setup_type] += 1
+                if trade['pnl'] > 0:
+                    setup_wins[setup_type] += 1
             
-            winning_signals = len([t for t in recent_trades if t['pnl'] > 0])
+            total_signals = len(recent_trades)
+            winning_signals = sum(setup_wins.values())
             win_rate = (winning_signals / total_signals * 100) if total_signals > 0 else 0
             
             return {
                 'total_signals': total_signals,
-                'choch_signals': choch_signals,
-                'bos_signals': bos_signals,
+                'choch_signals': setup_counts['CHOCH'],
+                'bos_signals': setup_counts['BOS'],
                 'win_rate': win_rate,
-                'choch_win_rate': self._calculate_setup_win_rate(recent_trades, 'CHOCH'),
-                'bos_win_rate': self._calculate_setup_win_rate(recent_trades, 'BOS')
+                'choch_win_rate': self._setup_win_rate(setup_counts, setup_wins, 'CHOCH'),
+                'bos_win_rate': self._setup_win_rate(setup_counts, setup_wins, 'BOS')
             }
             
         except Exception as e:
             print(f"❌ Error getting signal statistics: {str(e)}")
             return {}
     
-    def _calculate_setup_win_rate(self, trades: List[Dict], setup_type: str) -> float:
-        """Calculate win rate for specific setup type"""
-        setup_trades = [t for t in trades if t['setup_type'] == setup_type]
-        if not setup_trades:
+    def _setup_win_rate(self, setup_counts: Counter, setup_wins: Counter, setup_type: str) -> float:
+        """Calculate win rate for specific setup type from pre-aggregated counts"""
+        if not setup_counts[setup_type]:
             return 0.0
         
-        winning_trades = [t for t in setup_trades if t['pnl'] > 0]
-        return (len(winning_trades) / len(setup_trades)) * 100
\ No newline at end of file
+        return (setup_wins[setup_type] / setup_counts[setup_type]) * 100
\ No newline at end of file
@@ -4,9 +4,23 @@ Detects CHOCH (Change of Character) and BOS (Break of Structure) patterns
 """
 
 from typing import List, Dict, Optional
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from collections import namedtuple
+from dataclasses import replace
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from line_chart_config import LINE_CHART_CONFIG
+from structure_numba import NUMBA_AVAILABLE, find_swings, detect_structure
+from candles import Candles, candles_from_dicts
+from trade_signal import Signal
+
+logger = logging.getLogger(__name__)
+
+# Swing points as parallel arrays - indices ascending, prices are closes
+SwingArrays = namedtuple('SwingArrays', 'high_idx high_price low_idx low_price')
 
 class StructureDetector:
     def __init__(self, oanda_client, instruments: List[str]):
@@ -31,402 +45,674 @@ class StructureDetector:
         
         # ATR multiplier for distance validation (configurable)
         self.atr_multiplier = 2.0
+        
+        # Signature of the last candles analyzed and the signals they produced,
+        # per instrument, so ticks without a new candle skip all the work
+        self.last_signature = {}
+        self.last_signals = {}
+        
+        # Swings from the previous batch per instrument, for incremental detection
+        self._swing_cache = {}
+        
+        # Worker pool for analyze_all (created on first use)
+        self._executor = None
     
-    def analyze(self, instrument: str, candles: List[Dict]) -> List[Dict]:
+    def analyze(self, instrument: str, candles) -> List[Signal]:
         """
         Analyze candles for CHOCH and BOS setups using line chart methodology
         Focuses on closing prices while using OHLC for swing detection
         
         Args:
             instrument: Trading instrument
-            candles: List of candle data with line_price field
+            candles: Candles arrays, or a legacy list of candle dicts
         
         Returns:
             List of trading signals
         """
-        signals = []
+        candles = self._ensure_arrays(candles)
+        if len(candles.close) == 0:
+            return []  # No candles yet (or a failed fetch) - nothing to analyze
+        
+        # Polled faster than candles arrive: same input, same signals
+        signature = self._candles_signature(candles)
+        if self.last_signature.get(instrument) == signature:
+            return [replace(signal) for signal in self.last_signals[instrument]]
+        
+        now = datetime.now()  # One timestamp for every level and signal from this pass
         
         # ENFORCE LINE CHART MODE
         if not LINE_CHART_CONFIG.is_line_chart_mode():
-            print(f"⚠️ [{instrument}] ERROR: Line chart mode is disabled! Enabling it now...")
+            logger.warning("⚠️ [%s] Line chart mode is disabled! Enabling it now...", instrument)
             LINE_CHART_CONFIG.LINE_CHART_MODE = True
         
-        # Update previous day levels
-        self._update_previous_day_levels(instrument, candles)
+        if NUMBA_AVAILABLE:
+            # One compiled pass updates levels and ATR and finds swings
+            swings = self._run_structure_kernel(instrument, candles, now)
+        else:
+            # Update previous day levels
+            self._update_previous_day_levels(instrument, candles, now)
+            swings = None
+        
+        signals = self._detect_setups(instrument, candles, swings, now)
+        self._remember_signals(instrument, signature, signals)
+        return signals
+    
+    def _candles_signature(self, candles: Candles) -> tuple:
+        """
+        Cheap identity of a candle window: count, last time and last close
+        
+        Everything analyze() derives (levels, ATR, swings) is a function of the
+        candles, so an equal signature means equal signals. atr_multiplier is
+        included because the API can change it between ticks.
+        """
+        if len(candles.close) == 0:
+            return (0, None, None, self.atr_multiplier)
+        return (len(candles.close), candles.time[-1], float(candles.close[-1]), self.atr_multiplier)
+    
+    def _remember_signals(self, instrument: str, signature: tuple, signals: List[Signal]):
+        """Cache the signals produced for a candle signature"""
+        self.last_signature[instrument] = signature
+        self.last_signals[instrument] = [replace(signal) for signal in signals]
+    
+    def _detect_setups(self, instrument: str, candles: Candles, swings: Optional[SwingArrays], now: datetime) -> List[Signal]:
+        """
+        Run the CHOCH/BOS detectors once levels are stored
+        
+        Args:
+            instrument: Trading instrument
+            candles: Candles arrays
+            swings: Precomputed swings (ATR already stored), or None to compute both here
+            now: Timestamp stamped on every signal from this pass
+        
+        Returns:
+            List of trading signals
+        """
+        signals = []
         
         # Get current levels
         levels = self.previous_day_levels.get(instrument, {})
         if not levels:
             return signals
         
-        print(f"📈 [{instrument}] ANALYZING IN LINE CHART MODE - Using closing prices only")
-        print(f"🔄 [{instrument}] Line Chart Config: {LINE_CHART_CONFIG.get_config()}")
+        if swings is None:
+            # Calculate ATR for distance validation - before the flat check below, so
+            # ATR stays current through flat stretches as it does on the kernel path
+            self._calculate_atr(instrument, candles)
+        
+        # Flat closes over the ATR period: no structure to trade
+        if np.ptp(candles.close[-14:]) == 0:
+            logger.debug("[%s] Closes flat over the last 14 candles - skipping analysis", instrument)
+            return signals
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📈 [%s] ANALYZING IN LINE CHART MODE - Using closing prices only", instrument)
+            logger.debug("🔄 [%s] Line Chart Config: %s", instrument, LINE_CHART_CONFIG.get_config())
         
         pdh = levels.get('high')
         pdl = levels.get('low')
         pdh_broken = levels.get('high_broken', False)
         pdl_broken = levels.get('low_broken', False)
+        pdh_band = levels['high_band']
+        pdl_band = levels['low_band']
+        
+        if swings is None:
+            # Detect swing highs and lows using line chart methodology (closing prices)
+            swings = self._detect_swings_line_chart(candles, instrument=instrument)
         
-        # Calculate ATR for distance validation
-        self._calculate_atr(instrument, candles)
+        # Window bounds and slices shared by all detectors, computed once
+        n = len(candles.close)
+        recent20 = candles.close[-20:]
+        recent30 = candles.close[-30:]
         
-        # Detect swing highs and lows using line chart methodology (closing prices)
-        swing_highs, swing_lows = self._detect_swings_line_chart(candles)
+        # Shared inputs for the PDH/PDL and flipped-level CHOCH checks
+        choch_context = self._choch_context(recent20, n - 20, swings, now)
         
         # Check for CHOCH setups at PDH (not broken)
         if pdh and not pdh_broken:
-            choch_signal = self._detect_choch_at_high(candles, pdh, swing_lows, instrument)
+            choch_signal = self._detect_choch(choch_context, pdh, pdh_band, 'SELL', instrument)
             if choch_signal:
                 signals.append(choch_signal)
         
         # Check for CHOCH setups at PDL (not broken)
         if pdl and not pdl_broken:
-            choch_signal = self._detect_choch_at_low(candles, pdl, swing_highs, instrument)
+            choch_signal = self._detect_choch(choch_context, pdl, pdl_band, 'BUY', instrument)
             if choch_signal:
                 signals.append(choch_signal)
         
         # Check for BOS setups when PDH is broken
         if pdh and pdh_broken:
-            bos_signal = self._detect_bos_after_high_break(candles, pdh, swing_highs, instrument)
+            bos_signal = self._detect_bos_after_high_break(recent30, n - 30, pdh, pdh_band, swings, instrument, now)
             if bos_signal:
                 signals.append(bos_signal)
             
             # Also check for CHOCH at flipped level (PDH now acts as support)
-            choch_signal = self._detect_choch_at_flipped_high(candles, pdh, swing_highs, instrument)
+            choch_signal = self._detect_choch(choch_context, pdh, pdh_band, 'BUY', instrument)
             if choch_signal:
                 signals.append(choch_signal)
         
         # Check for BOS setups when PDL is broken
         if pdl and pdl_broken:
-            bos_signal = self._detect_bos_after_low_break(candles, pdl, swing_lows, instrument)
+            bos_signal = self._detect_bos_after_low_break(recent30, n - 30, pdl, pdl_band, swings, instrument, now)
             if bos_signal:
                 signals.append(bos_signal)
             
             # Also check for CHOCH at flipped level (PDL now acts as resistance)
-            choch_signal = self._detect_choch_at_flipped_low(candles, pdl, swing_lows, instrument)
+            choch_signal = self._detect_choch(choch_context, pdl, pdl_band, 'SELL', instrument)
             if choch_signal:
                 signals.append(choch_signal)
         
         return signals
     
-    def _update_previous_day_levels(self, instrument: str, candles: List[Dict]):
-        """Update or create previous day high/low levels"""
-        if len(candles) < 480:  # Need at least 24 hours of 3-min candles
-            return
+    def analyze_all(self, candles_by_instrument: Dict[str, Candles]) -> Dict[str, List[Signal]]:
+        """
+        Analyze several instruments concurrently
+        
+        Each worker only touches its own instrument's entries in the per-instrument
+        state dicts, so no locking is needed. NumPy reductions and the nogil
+        numba kernels release the GIL, which is where the overlap comes from.
+        
+        Args:
+            candles_by_instrument: Candles per instrument
+        
+        Returns:
+            Signals per instrument
+        """
+        if self._executor is None:
+            workers = max(1, min(len(self.instruments), os.cpu_count() or 1))
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="structure")
+        
+        instruments = list(candles_by_instrument)
+        results = self._executor.map(
+            self.analyze, instruments, [candles_by_instrument[i] for i in instruments]
+        )
+        return dict(zip(instruments, results))
+    
+    def analyze_batch(self, candles_by_instrument: Dict[str, Candles], lookback: int = 5, period: int = 14) -> Dict[str, List[Signal]]:
+        """
+        Analyze several instruments with aligned candle windows in one pass
+        
+        When every instrument has the same number of candles (same cadence and
+        count), highs/lows/closes are stacked into (instruments, candles) arrays
+        and ATR and swings are computed once along axis 1. Previous day levels
+        (which depend on each instrument's candle times) and the CHOCH/BOS
+        detectors run per instrument. Unaligned or too-short input falls back
+        to analyze_all.
+        
+        Args:
+            candles_by_instrument: Candles per instrument
+            lookback: Swing detection lookback
+            period: ATR period
         
-        # Get yesterday's candles (last 480 candles = 24 hours)
-        yesterday_candles = candles[-960:-480]  # 2 days ago to yesterday
+        Returns:
+            Signals per instrument
+        """
+        instruments = list(candles_by_instrument)
+        batch = [self._ensure_arrays(candles_by_instrument[i]) for i in instruments]
+        lengths = {len(candles.close) for candles in batch}
+        if len(lengths) != 1 or min(lengths) < max(2 * lookback + 1, period + 1):
+            return self.analyze_all(dict(zip(instruments, batch)))
+        
+        # Rows whose candles haven't advanced reuse their cached signals
+        signatures = [self._candles_signature(candles) for candles in batch]
+        fresh = [self.last_signature.get(i) != sig for i, sig in zip(instruments, signatures)]
+        if not any(fresh):
+            return {i: [replace(signal) for signal in self.last_signals[i]] for i in instruments}
+        
+        if not LINE_CHART_CONFIG.is_line_chart_mode():
+            logger.warning("⚠️ Line chart mode is disabled! Enabling it now...")
+            LINE_CHART_CONFIG.LINE_CHART_MODE = True
+        
+        highs = np.stack([candles.high for candles in batch])
+        lows = np.stack([candles.low for candles in batch])
+        closes = np.stack([candles.close for candles in batch])
+        
+        # ATR per row (same closed-form Wilder RMA as _calculate_atr)
+        prev_closes = closes[:, :-1]
+        true_ranges = np.maximum.reduce([
+            highs[:, 1:] - lows[:, 1:],
+            np.abs(highs[:, 1:] - prev_closes),
+            np.abs(lows[:, 1:] - prev_closes)
+        ])
+        alpha = 1.0 / period
+        later_ranges = true_ranges[:, period:]
+        decay = (1.0 - alpha) ** np.arange(later_ranges.shape[1] - 1, -1, -1)
+        atr = (true_ranges[:, :period].mean(axis=1) * (1.0 - alpha) ** later_ranges.shape[1]
+               + alpha * (later_ranges @ decay))
+        
+        # Swing masks per row (same windows as _find_swing_indices)
+        windows = sliding_window_view(closes, 2 * lookback + 1, axis=1)
+        center = windows[:, :, lookback]
+        left = windows[:, :, :lookback]
+        right = windows[:, :, lookback + 1:]
+        is_high = center > np.maximum(left.max(axis=2), right.max(axis=2))
+        is_low = center < np.minimum(left.min(axis=2), right.min(axis=2))
+        
+        now = datetime.now()
+        results = {}
+        for row, (instrument, candles) in enumerate(zip(instruments, batch)):
+            if not fresh[row]:
+                results[instrument] = [replace(signal) for signal in self.last_signals[instrument]]
+                continue
+            
+            # Day boundaries can differ per instrument (gaps), so levels stay per row
+            self._update_previous_day_levels(instrument, candles, now)
+            signals = []
+            if instrument in self.previous_day_levels:
+                self.atr_values[instrument] = float(atr[row])
+                
+                high_idx = np.flatnonzero(is_high[row]).astype(np.int64) + lookback
+                low_idx = np.flatnonzero(is_low[row]).astype(np.int64) + lookback
+                swings = SwingArrays(
+                    high_idx=high_idx,
+                    high_price=candles.close[high_idx],
+                    low_idx=low_idx,
+                    low_price=candles.close[low_idx]
+                )
+                signals = self._detect_setups(instrument, candles, swings, now)
+            
+            self._remember_signals(instrument, signatures[row], signals)
+            results[instrument] = signals
         
-        if not yesterday_candles:
+        return results
+    
+    def _ensure_arrays(self, candles) -> Candles:
+        """Pass Candles through unchanged; convert a legacy list of candle dicts once"""
+        if isinstance(candles, Candles):
+            return candles
+        return candles_from_dicts(candles)
+    
+    def _run_structure_kernel(self, instrument: str, candles: Candles, now: datetime, lookback: int = 5, period: int = 14) -> SwingArrays:
+        """
+        Run the compiled structure kernel (numba only)
+        
+        Stores previous day levels and ATR exactly as _update_previous_day_levels
+        and _calculate_atr would, and returns the swings for the detectors.
+        """
+        day_start, day_end = self._previous_day_bounds(candles.time)
+        (high_idx, low_idx, atr, has_atr,
+         pdh, pdl, pdh_broken, pdl_broken, has_levels) = detect_structure(
+            candles.high, candles.low, candles.close, lookback, period, day_start, day_end, 100
+        )
+        
+        if has_levels:
+            self._store_levels(instrument, float(pdh), float(pdl),
+                               bool(pdh_broken), bool(pdl_broken), now)
+            
+            if has_atr:
+                self.atr_values[instrument] = float(atr)
+                logger.debug("[%s] ATR updated: %.5f", instrument, atr)
+        
+        return SwingArrays(
+            high_idx=high_idx,
+            high_price=candles.close[high_idx],
+            low_idx=low_idx,
+            low_price=candles.close[low_idx]
+        )
+    
+    def _previous_day_bounds(self, times: np.ndarray) -> tuple:
+        """
+        Index range [start, end) of the previous trading day's candles
+        
+        Days are UTC calendar days found by binary search on the candle times,
+        so weekends and gaps don't shift the window: on a Monday the previous
+        day is the last day with candles (Friday). Empty range if there is none.
+        """
+        if len(times) == 0:
+            return 0, 0
+        
+        end = int(np.searchsorted(times, times[-1].astype('datetime64[D]')))
+        if end == 0:
+            return 0, 0
+        
+        start = int(np.searchsorted(times, times[end - 1].astype('datetime64[D]')))
+        return start, end
+    
+    def _update_previous_day_levels(self, instrument: str, candles: Candles, now: datetime):
+        """Update or create previous day high/low levels"""
+        start, end = self._previous_day_bounds(candles.time)
+        if end == start:  # No completed previous day in the window
             return
         
         # Calculate previous day high and low
-        pdh = max([c['high'] for c in yesterday_candles])
-        pdl = min([c['low'] for c in yesterday_candles])
+        pdh = float(candles.high[start:end].max())
+        pdl = float(candles.low[start:end].min())
         
         # Check if levels are broken
-        recent_candles = candles[-100:]  # Last 100 candles (5 hours)
-        current_high = max([c['high'] for c in recent_candles])
-        current_low = min([c['low'] for c in recent_candles])
+        current_high = float(candles.high[-100:].max())  # Last 100 candles (5 hours)
+        current_low = float(candles.low[-100:].min())
         
         pdh_broken = current_high > pdh
         pdl_broken = current_low < pdl
         
         # Store levels
+        self._store_levels(instrument, pdh, pdl, pdh_broken, pdl_broken, now)
+    
+    def _store_levels(self, instrument: str, pdh: float, pdl: float, pdh_broken: bool, pdl_broken: bool, now: datetime):
+        """
+        Store previous day levels with their 0.1% tolerance bands
+        
+        The bands are (level * 0.999, level * 1.001), used for the touch checks
+        and stop losses, so the detectors compare against ready-made scalars.
+        """
         self.previous_day_levels[instrument] = {
             'high': pdh,
             'low': pdl,
             'high_broken': pdh_broken,
             'low_broken': pdl_broken,
-            'updated_at': datetime.now()
+            'high_band': (pdh * 0.999, pdh * 1.001),
+            'low_band': (pdl * 0.999, pdl * 1.001),
+            'updated_at': now
         }
     
-    def _detect_swings_line_chart(self, candles: List[Dict], lookback: int = 5) -> tuple:
+    def _detect_swings_line_chart(self, candles: Candles, lookback: int = 5, instrument: Optional[str] = None) -> SwingArrays:
         """
         Detect swing highs and swing lows using LINE CHART methodology
         Uses closing prices only as per line chart strategy
         
+        When an instrument is given, swings from its previous call are reused:
+        only candles that were too close to the old end to be settled (or are
+        new) get scanned again.
+        
         Args:
-            candles: Price data with closing prices
+            candles: Candles arrays (closing prices are used)
             lookback: Number of candles to look back for swing detection
+            instrument: Trading instrument, enables the incremental swing cache
         
         Returns:
-            Tuple of (swing_highs, swing_lows)
+            SwingArrays of ascending swing indices and their closing prices
         """
-        swing_highs = []
-        swing_lows = []
+        closes = candles.close
+        n = len(closes)
+        high_idx = low_idx = None
+        
+        cached = self._swing_cache.get(instrument) if instrument else None
+        if cached and cached['lookback'] == lookback and n > 0:
+            # Locate the previous batch's last candle in this batch
+            pos = int(np.searchsorted(candles.time, cached['last_time']))
+            if pos < n and candles.time[pos] == cached['last_time']:
+                shift = cached['n'] - 1 - pos  # Candles dropped from the front
+                settled = cached['n'] - lookback - shift  # First index the cache can't vouch for
+                
+                if shift >= 0 and settled >= lookback:
+                    old_high = cached['high_idx'] - shift
+                    old_low = cached['low_idx'] - shift
+                    
+                    # Rescan from `lookback` candles before the first unsettled index
+                    start = settled - lookback
+                    tail_high, tail_low = self._find_swing_indices(closes[start:], lookback)
+                    
+                    high_idx = np.concatenate((old_high[old_high >= lookback], tail_high + start))
+                    low_idx = np.concatenate((old_low[old_low >= lookback], tail_low + start))
+        
+        if high_idx is None:
+            high_idx, low_idx = self._find_swing_indices(closes, lookback)
+        
+        if instrument and n > 0:
+            self._swing_cache[instrument] = {
+                'lookback': lookback,
+                'n': n,
+                'last_time': candles.time[-1],
+                'high_idx': high_idx,
+                'low_idx': low_idx
+            }
         
-        for i in range(lookback, len(candles) - lookback):
-            current_close = candles[i]['close']
-            
-            # Check for swing high using CLOSING PRICES only (line chart method)
-            is_swing_high = True
-            for j in range(1, lookback + 1):
-                if current_close <= candles[i - j]['close'] or current_close <= candles[i + j]['close']:
-                    is_swing_high = False
-                    break
-            
-            if is_swing_high:
-                swing_highs.append({
-                    'price': current_close,  # Use closing price for line chart
-                    'index': i,
-                    'time': candles[i]['time']
-                })
-            
-            # Check for swing low using CLOSING PRICES only (line chart method)
-            is_swing_low = True
-            for j in range(1, lookback + 1):
-                if current_close >= candles[i - j]['close'] or current_close >= candles[i + j]['close']:
-                    is_swing_low = False
-                    break
-            
-            if is_swing_low:
-                swing_lows.append({
-                    'price': current_close,  # Use closing price for line chart
-                    'index': i,
-                    'time': candles[i]['time']
-                })
-        
-        return swing_highs, swing_lows
+        return SwingArrays(
+            high_idx=high_idx,
+            high_price=closes[high_idx],  # Use closing price for line chart
+            low_idx=low_idx,
+            low_price=closes[low_idx]
+        )
     
-    def _detect_swings(self, candles: List[Dict], lookback: int = 5) -> tuple:
+    def _find_swing_indices(self, closes: np.ndarray, lookback: int) -> tuple:
+        """Full scan of closing prices for swing high and swing low indices"""
+        # Compiled fast path when numba is installed
+        if NUMBA_AVAILABLE:
+            return find_swings(closes, lookback)
+        
+        if len(closes) < 2 * lookback + 1:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        
+        # One row per candidate candle: lookback closes, the candle, lookback closes
+        windows = sliding_window_view(closes, 2 * lookback + 1)
+        center = windows[:, lookback]
+        left = windows[:, :lookback]
+        right = windows[:, lookback + 1:]
+        
+        # Swing high/low must be strictly beyond every neighbor (line chart method)
+        neighbor_max = np.maximum(left.max(axis=1), right.max(axis=1))
+        neighbor_min = np.minimum(left.min(axis=1), right.min(axis=1))
+        
+        high_idx = np.flatnonzero(center > neighbor_max).astype(np.int64) + lookback
+        low_idx = np.flatnonzero(center < neighbor_min).astype(np.int64) + lookback
+        return high_idx, low_idx
+    
+    def _detect_swings(self, candles: Candles, lookback: int = 5) -> SwingArrays:
         """
         Legacy swing detection method - kept for compatibility
         """
         return self._detect_swings_line_chart(candles, lookback)
     
-    def _detect_choch_at_high(self, candles: List[Dict], pdh: float, swing_lows: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect CHOCH (reversal) at previous day high using LINE CHART method"""
-        if len(candles) < 20:
-            return None
-        
-        recent_candles = candles[-20:]  # Last 20 candles
-        current_price = recent_candles[-1]['close']
-        
-        # Check if CLOSING PRICE recently touched PDH (line chart method)
-        touched_pdh = any(c['close'] >= pdh * 0.999 for c in recent_candles)  # 0.1% tolerance
+    def _latest_swing_since(self, swing_idx: np.ndarray, swing_price: np.ndarray, start_index: int) -> Optional[float]:
+        """
+        Price of the latest swing if it is at or after start_index, else None
         
-        if not touched_pdh:
+        Indices are ascending, so the latest swing is the last one and the
+        window test is a single comparison.
+        """
+        if len(swing_idx) == 0 or swing_idx[-1] < start_index:
             return None
+        return float(swing_price[-1])
+    
+    def _choch_context(self, recent_closes: np.ndarray, start_index: int, swings: SwingArrays, now: datetime) -> Optional[Dict]:
+        """
+        Precompute the inputs shared by every CHOCH check in one analyze pass
         
-        # Find the most recent swing low after touching PDH
-        recent_swing_lows = [sl for sl in swing_lows if sl['index'] >= len(candles) - 20]
+        The PDH/PDL checks and their flipped counterparts all look at the same
+        20-candle window, so it is sliced and reduced only once.
         
-        if not recent_swing_lows:
+        Args:
+            recent_closes: Last 20 closing prices
+            start_index: Candle index of the first close in the window
+            swings: All detected swing highs and lows
+            now: Timestamp for the signals built from this context
+        """
+        if len(recent_closes) < 20:
             return None
         
-        latest_swing_low = recent_swing_lows[-1]
-        
-        # Check if current price broke below the swing low (CHOCH confirmation)
-        if current_price < latest_swing_low['price']:
-            # Find the rejection high using CLOSING PRICES (line chart method)
-            rejection_high = max([c['close'] for c in recent_candles[:15]])
-            
-            # Calculate stop loss (above rejection high)
-            stop_loss = rejection_high * 1.001  # Add small buffer
-            
-            return {
-                'instrument': instrument,
-                'setup_type': 'CHOCH',
-                'direction': 'SELL',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdh,
-                'swing_break_level': latest_swing_low['price'],
-                'timestamp': datetime.now()
-            }
-        
-        return None
+        return {
+            'recent_closes': recent_closes,
+            'current_price': float(recent_closes[-1]),
+            'latest_swing_high': self._latest_swing_since(swings.high_idx, swings.high_price, start_index),
+            'latest_swing_low': self._latest_swing_since(swings.low_idx, swings.low_price, start_index),
+            # Rejection extremes using CLOSING PRICES (line chart method)
+            'rejection_high': float(recent_closes[:15].max()),
+            'rejection_low': float(recent_closes[:15].min()),
+            'timestamp': now
+        }
     
-    def _detect_choch_at_low(self, candles: List[Dict], pdl: float, swing_highs: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect CHOCH (reversal) at previous day low using LINE CHART method"""
-        if len(candles) < 20:
-            return None
-        
-        recent_candles = candles[-20:]
-        current_price = recent_candles[-1]['close']
+    def _detect_choch(self, context: Optional[Dict], level: float, band: tuple, direction: str, instrument: str) -> Optional[Signal]:
+        """
+        Detect CHOCH (reversal) at a level using LINE CHART method
         
-        # Check if CLOSING PRICE recently touched PDL (line chart method)
-        touched_pdl = any(c['close'] <= pdl * 1.001 for c in recent_candles)
+        SELL: closes touched the level from below, then broke the latest swing low
+        BUY: closes touched the level from above, then broke the latest swing high
         
-        if not touched_pdl:
+        `band` is the level's (lower, upper) 0.1% tolerance band from the levels dict
+        """
+        if context is None:
             return None
         
-        # Find the most recent swing high after touching PDL
-        recent_swing_highs = [sh for sh in swing_highs if sh['index'] >= len(candles) - 20]
-        
-        if not recent_swing_highs:
-            return None
+        recent_closes = context['recent_closes']
+        current_price = context['current_price']
         
-        latest_swing_high = recent_swing_highs[-1]
+        if direction == 'SELL':
+            # Check if CLOSING PRICE recently touched the level (0.1% tolerance)
+            touched = bool((recent_closes >= band[0]).any())
+            swing_break_level = context['latest_swing_low']
+        else:
+            touched = bool((recent_closes <= band[1]).any())
+            swing_break_level = context['latest_swing_high']
         
-        # Check if current price broke above the swing high (CHOCH confirmation)
-        if current_price > latest_swing_high['price']:
-            # Find the rejection low using CLOSING PRICES (line chart method)
-            rejection_low = min([c['close'] for c in recent_candles[:15]])
-            
-            # Calculate stop loss (below rejection low)
-            stop_loss = rejection_low * 0.999
-            
-            return {
-                'instrument': instrument,
-                'setup_type': 'CHOCH',
-                'direction': 'BUY',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdl,
-                'swing_break_level': latest_swing_high['price'],
-                'timestamp': datetime.now()
-            }
+        if not touched or swing_break_level is None:
+            return None
         
-        return None
+        # Check if current price broke the latest swing (CHOCH confirmation)
+        if direction == 'SELL':
+            if current_price >= swing_break_level:
+                return None
+            stop_loss = context['rejection_high'] * 1.001  # Above rejection high
+        else:
+            if current_price <= swing_break_level:
+                return None
+            stop_loss = context['rejection_low'] * 0.999  # Below rejection low
+        
+        return Signal(
+            instrument=instrument,
+            setup_type='CHOCH',
+            direction=direction,
+            entry_price=current_price,
+            stop_loss=stop_loss,
+            reference_level=level,
+            swing_break_level=swing_break_level,
+            timestamp=context['timestamp']
+        )
     
-    def _detect_bos_after_high_break(self, candles: List[Dict], pdh: float, swing_highs: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect BOS (continuation) after PDH is broken using LINE CHART method"""
-        if len(candles) < 30:
+    def _detect_bos_after_high_break(self, recent_closes: np.ndarray, start_index: int, pdh: float, pdh_band: tuple, swings: SwingArrays, instrument: str, now: datetime) -> Optional[Signal]:
+        """Detect BOS (continuation) after PDH is broken using LINE CHART method (last 30 closes)"""
+        if len(recent_closes) < 30:
             return None
         
-        recent_candles = candles[-30:]
-        current_price = recent_candles[-1]['close']
+        current_price = float(recent_closes[-1])
         
         # Check if PDH was recently broken using CLOSING PRICES (line chart method)
-        broken_pdh = any(c['close'] > pdh for c in recent_candles[:20])
+        broken_pdh = bool((recent_closes[:20] > pdh).any())
         
         if not broken_pdh:
             return None
         
         # Check if BOS is not too far from PDH using ATR-based distance
-        current_high = max([c['close'] for c in recent_candles])  # Use closing prices
+        current_high = float(recent_closes.max())  # Use closing prices
         
         if self._is_bos_too_far(instrument, current_high, pdh):
-            distance_ratio = self._calculate_distance_ratio(instrument, current_high, pdh)
-            print(f"[{instrument}] BOS rejected - too far from PDH. Distance: {distance_ratio:.2f}x ATR (max: {self.atr_multiplier}x)")
+            if logger.isEnabledFor(logging.DEBUG):
+                distance_ratio = self._calculate_distance_ratio(instrument, current_high, pdh)
+                logger.debug("[%s] BOS rejected - too far from PDH. Distance: %.2fx ATR (max: %sx)", instrument, distance_ratio, self.atr_multiplier)
             return None
         
         # Find recent swing high after breaking PDH
-        recent_swing_highs = [sh for sh in swing_highs if sh['index'] >= len(candles) - 30]
+        latest_swing_high = self._latest_swing_since(swings.high_idx, swings.high_price, start_index)
         
-        if not recent_swing_highs:
+        if latest_swing_high is None:
             return None
         
-        latest_swing_high = recent_swing_highs[-1]
-        
         # Check if price broke above the swing high (BOS confirmation)
-        if current_price > latest_swing_high['price']:
+        if current_price > latest_swing_high:
             # Stop loss below the broken PDH
-            stop_loss = pdh * 0.999
+            stop_loss = pdh_band[0]
             
             distance_ratio = self._calculate_distance_ratio(instrument, current_price, pdh)
-            print(f"[{instrument}] BOS BUY signal accepted. Distance: {distance_ratio:.2f}x ATR from PDH")
+            logger.debug("[%s] BOS BUY signal accepted. Distance: %.2fx ATR from PDH", instrument, distance_ratio)
             
-            return {
-                'instrument': instrument,
-                'setup_type': 'BOS',
-                'direction': 'BUY',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdh,
-                'swing_break_level': latest_swing_high['price'],
-                'distance_atr_ratio': distance_ratio,
-                'timestamp': datetime.now()
-            }
+            return Signal(
+                instrument=instrument,
+                setup_type='BOS',
+                direction='BUY',
+                entry_price=current_price,
+                stop_loss=stop_loss,
+                reference_level=pdh,
+                swing_break_level=latest_swing_high,
+                distance_atr_ratio=distance_ratio,
+                timestamp=now
+            )
         
         return None
     
-    def _detect_bos_after_low_break(self, candles: List[Dict], pdl: float, swing_lows: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect BOS (continuation) after PDL is broken using LINE CHART method"""
-        if len(candles) < 30:
+    def _detect_bos_after_low_break(self, recent_closes: np.ndarray, start_index: int, pdl: float, pdl_band: tuple, swings: SwingArrays, instrument: str, now: datetime) -> Optional[Signal]:
+        """Detect BOS (continuation) after PDL is broken using LINE CHART method (last 30 closes)"""
+        if len(recent_closes) < 30:
             return None
         
-        recent_candles = candles[-30:]
-        current_price = recent_candles[-1]['close']
+        current_price = float(recent_closes[-1])
         
         # Check if PDL was recently broken using CLOSING PRICES (line chart method)
-        broken_pdl = any(c['close'] < pdl for c in recent_candles[:20])
+        broken_pdl = bool((recent_closes[:20] < pdl).any())
         
         if not broken_pdl:
             return None
         
         # Check if BOS is not too far from PDL using ATR-based distance
-        current_low = min([c['close'] for c in recent_candles])  # Use closing prices
+        current_low = float(recent_closes.min())  # Use closing prices
         
         if self._is_bos_too_far(instrument, current_low, pdl):
-            distance_ratio = self._calculate_distance_ratio(instrument, current_low, pdl)
-            print(f"[{instrument}] BOS rejected - too far from PDL. Distance: {distance_ratio:.2f}x ATR (max: {self.atr_multiplier}x)")
+            if logger.isEnabledFor(logging.DEBUG):
+                distance_ratio = self._calculate_distance_ratio(instrument, current_low, pdl)
+                logger.debug("[%s] BOS rejected - too far from PDL. Distance: %.2fx ATR (max: %sx)", instrument, distance_ratio, self.atr_multiplier)
             return None
         
         # Find recent swing low after breaking PDL
-        recent_swing_lows = [sl for sl in swing_lows if sl['index'] >= len(candles) - 30]
+        latest_swing_low = self._latest_swing_since(swings.low_idx, swings.low_price, start_index)
         
-        if not recent_swing_lows:
+        if latest_swing_low is None:
             return None
         
-        latest_swing_low = recent_swing_lows[-1]
-        
         # Check if price broke below the swing low (BOS confirmation)
-        if current_price < latest_swing_low['price']:
+        if current_price < latest_swing_low:
             # Stop loss above the broken PDL
-            stop_loss = pdl * 1.001
+            stop_loss = pdl_band[1]
             
             distance_ratio = self._calculate_distance_ratio(instrument, current_price, pdl)
-            print(f"[{instrument}] BOS SELL signal accepted. Distance: {distance_ratio:.2f}x ATR from PDL")
+            logger.debug("[%s] BOS SELL signal accepted. Distance: %.2fx ATR from PDL", instrument, distance_ratio)
             
-            return {
-                'instrument': instrument,
-                'setup_type': 'BOS',
-                'direction': 'SELL',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdl,
-                'swing_break_level': latest_swing_low['price'],
-                'distance_atr_ratio': distance_ratio,
-                'timestamp': datetime.now()
-            }
+            return Signal(
+                instrument=instrument,
+                setup_type='BOS',
+                direction='SELL',
+                entry_price=current_price,
+                stop_loss=stop_loss,
+                reference_level=pdl,
+                swing_break_level=latest_swing_low,
+                distance_atr_ratio=distance_ratio,
+                timestamp=now
+            )
         
         return None
     
-    def _detect_choch_at_flipped_high(self, candles: List[Dict], pdh: float, swing_highs: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect CHOCH at flipped PDH (now acting as support)"""
-        # Similar logic to _detect_choch_at_low but using the flipped PDH
-        return self._detect_choch_at_low(candles, pdh, swing_highs, instrument)
-    
-    def _detect_choch_at_flipped_low(self, candles: List[Dict], pdl: float, swing_lows: List[Dict], instrument: str) -> Optional[Dict]:
-        """Detect CHOCH at flipped PDL (now acting as resistance)"""
-        # Similar logic to _detect_choch_at_high but using the flipped PDL
-        return self._detect_choch_at_high(candles, pdl, swing_lows, instrument)
-    
-    def _calculate_atr(self, instrument: str, candles: List[Dict], period: int = 14):
+    def _calculate_atr(self, instrument: str, candles: Candles, period: int = 14):
         """
-        Calculate Average True Range for the instrument
+        Calculate Average True Range for the instrument (Wilder's smoothing)
         
         Args:
             instrument: Trading instrument
-            candles: Price data
+            candles: Candles arrays
             period: ATR calculation period (default 14)
         """
-        if len(candles) < period + 1:
+        if len(candles.close) < period + 1:
             return
         
-        true_ranges = []
-        
-        for i in range(1, len(candles)):
-            high = candles[i]['high']
-            low = candles[i]['low']
-            prev_close = candles[i-1]['close']
-            
-            # True Range = max(high-low, |high-prev_close|, |low-prev_close|)
-            tr1 = high - low
-            tr2 = abs(high - prev_close)
-            tr3 = abs(low - prev_close)
-            
-            true_range = max(tr1, tr2, tr3)
-            true_ranges.append(true_range)
-        
-        # Calculate ATR as simple moving average of True Ranges
-        if len(true_ranges) >= period:
-            atr = sum(true_ranges[-period:]) / period
-            self.atr_values[instrument] = atr
-            print(f"[{instrument}] ATR updated: {atr:.5f}")
+        highs = candles.high[1:]
+        lows = candles.low[1:]
+        prev_closes = candles.close[:-1]
+        
+        # True Range = max(high-low, |high-prev_close|, |low-prev_close|)
+        true_ranges = np.maximum.reduce([
+            highs - lows,
+            np.abs(highs - prev_closes),
+            np.abs(lows - prev_closes)
+        ])
+        
+        # Wilder's RMA: seed with the SMA of the first `period` TRs, then
+        # atr = atr + (tr - atr) / period for each later TR, in closed form
+        alpha = 1.0 / period
+        later_ranges = true_ranges[period:]
+        decay = (1.0 - alpha) ** np.arange(len(later_ranges) - 1, -1, -1)
+        atr = float(
+            true_ranges[:period].mean() * (1.0 - alpha) ** len(later_ranges)
+            + alpha * np.dot(decay, later_ranges)
+        )
+        
+        self.atr_values[instrument] = atr
+        logger.debug("[%s] ATR updated: %.5f", instrument, atr)
     
     def _is_bos_too_far(self, instrument: str, bos_level: float, reference_level: float) -> bool:
         """
@@ -442,7 +728,7 @@ class StructureDetector:
         """
         atr = self.atr_values.get(instrument)
         if not atr:
-            print(f"[{instrument}] No ATR available, using fallback distance check")
+            logger.debug("[%s] No ATR available, using fallback distance check", instrument)
             return False  # Allow trade if no ATR data
         
         distance = abs(bos_level - reference_level)
@@ -6,8 +6,21 @@ Uses close-to-close volatility for BOS validation
 """
 
 from typing import List, Dict, Optional
+from collections import namedtuple
+from dataclasses import replace
 from datetime import datetime, timedelta
+import logging
+import time
 import numpy as np
+from structure_numba import NUMBA_AVAILABLE, find_swings
+from candles import Candles, candles_from_dicts
+from trade_signal import Signal
+
+logger = logging.getLogger(__name__)
+
+# Swings as parallel arrays in candle order; entry i across all arrays is swing i.
+# prices are float64 closes, indices int64 candle positions, times datetime64[ns]
+SwingArray = namedtuple('SwingArray', 'prices indices times')
 
 class StructureDetector:
     def __init__(self, oanda_client, instruments: List[str]):
@@ -30,51 +43,158 @@ class StructureDetector:
         # Store ATR values for each instrument (for distance calculation)
         self.atr_values = {}
         
-        # Store last signal time to prevent duplicate signals
+        # Wilder smoothing state per instrument: {'atr', 'last_time'}
+        self._atr_state = {}
+        
+        # Previous day high/low per instrument: {'date', 'pdh', 'pdl'} - fixed for a UTC day
+        self._pdh_pdl_cache = {}
+        
+        # Last signal time (time.monotonic seconds) per (instrument, setup_type, direction)
+        # to prevent duplicate signals
         self.last_signal_time = {}
+        
+        # Last candle signature and the (pre-duplicate-filter) signals it produced,
+        # per instrument, so polling faster than new candles arrive is a dict lookup
+        self.last_signature = {}
+        self.last_signals = {}
+        
+        # Compile the swing kernel now so the first real tick doesn't pay for it
+        if NUMBA_AVAILABLE:
+            find_swings(np.linspace(0.0, 1.0, 100), 1)
 
-    def analyze(self, instrument: str, candles: List[Dict]) -> List[Dict]:
+    def analyze(self, instrument: str, candles) -> List[Signal]:
         """
         Analyze candles for CHOCH and BOS setups
         ✅ USES ONLY CLOSE PRICES (LINE GRAPH)
         
         Args:
             instrument: Trading instrument
-            candles: List of candle data
+            candles: Candles arrays, or a legacy list of candle dicts
         
         Returns:
             List of trading signals
         """
-        signals = []
+        # Convert once; every helper below reads these arrays
+        candles = self._ensure_arrays(candles)
         
-        if len(candles) < 100:
-            print(f"⚠️ Not enough candles for {instrument}: {len(candles)}")
-            return signals
+        if len(candles.close) < 100:
+            logger.warning("⚠️ Not enough candles for %s: %d", instrument, len(candles.close))
+            return []
+        
+        # One clock read per tick: wall clock for signals, monotonic for duplicate spacing
+        now = datetime.now()
+        now_monotonic = time.monotonic()
+        
+        # Same candles as last call: reuse the signals instead of re-analyzing
+        signature = (len(candles.close), candles.time[-1], float(candles.close[-1]))
+        if self.last_signature.get(instrument) == signature:
+            signals = [replace(signal) for signal in self.last_signals[instrument]]
+        else:
+            signals = self._detect_signals(instrument, candles, now)
+            self.last_signature[instrument] = signature
+            self.last_signals[instrument] = [replace(signal) for signal in signals]
+        
+        # Filter out duplicate signals (within 10 candles) - DISABLED FOR TESTING
+        # signals = self._filter_duplicate_signals(instrument, signals, now_monotonic)
+        logger.debug("   📊 Final signal count for %s: %d", instrument, len(signals))
+        
+        return signals
+
+    def analyze_batch(self, candles_by_instrument: Dict[str, Candles], lookback: int = 1) -> Dict[str, List[Signal]]:
+        """
+        Analyze several instruments with aligned candle windows in one pass
+        
+        When every instrument has the same number of candles, closes are
+        stacked into an (instruments, candles) array and the swing masks are
+        computed once along axis 1. Volatility, previous day levels and the
+        CHOCH/BOS detectors run per instrument, since they depend on each
+        instrument's own state and candle times. Unaligned or too-short input
+        falls back to analyze per instrument.
+        
+        Args:
+            candles_by_instrument: Candles (or legacy candle dicts) per instrument
+            lookback: Swing detection lookback
+        
+        Returns:
+            Signals per instrument
+        """
+        instruments = list(candles_by_instrument)
+        batch = [self._ensure_arrays(candles_by_instrument[i]) for i in instruments]
+        lengths = {len(candles.close) for candles in batch}
+        if len(lengths) != 1 or min(lengths) < 100:
+            return {i: self.analyze(i, candles) for i, candles in zip(instruments, batch)}
+        
+        now = datetime.now()
+        
+        # Rows whose candles haven't advanced reuse their cached signals
+        signatures = [(len(c.close), c.time[-1], float(c.close[-1])) for c in batch]
+        fresh = [self.last_signature.get(i) != sig for i, sig in zip(instruments, signatures)]
+        
+        results = {}
+        if any(fresh):
+            # Swing masks per row (same comparisons as _detect_swings_line_graph)
+            closes = np.stack([candles.close for candles in batch])
+            n = closes.shape[1]
+            centers = closes[:, lookback:n - lookback]
+            neighbors = [closes[:, lookback - j:n - lookback - j] for j in range(1, lookback + 1)]
+            neighbors += [closes[:, lookback + j:n - lookback + j] for j in range(1, lookback + 1)]
+            is_high = centers > np.maximum.reduce(neighbors)
+            is_low = centers < np.minimum.reduce(neighbors)
+        
+        for row, (instrument, candles) in enumerate(zip(instruments, batch)):
+            if fresh[row]:
+                swings = (
+                    self._swing_array(candles, np.flatnonzero(is_high[row]) + lookback),
+                    self._swing_array(candles, np.flatnonzero(is_low[row]) + lookback)
+                )
+                signals = self._detect_signals(instrument, candles, now, swings)
+                self.last_signature[instrument] = signatures[row]
+                self.last_signals[instrument] = [replace(signal) for signal in signals]
+            else:
+                signals = [replace(signal) for signal in self.last_signals[instrument]]
+            
+            logger.debug("   📊 Final signal count for %s: %d", instrument, len(signals))
+            results[instrument] = signals
+        
+        return results
+
+    def _detect_signals(self, instrument: str, candles: Candles, now: datetime, swings: Optional[tuple] = None) -> List[Signal]:
+        """
+        Run levels, volatility, swings and every setup detector on fresh candles
+        
+        swings: (swing_highs, swing_lows) already computed by analyze_batch
+        """
+        signals = []
         
-        # Extract ONLY close prices for pure line graph analysis
-        close_prices = [c['close'] for c in candles]
+        # ONLY close prices for pure line graph analysis
+        close_prices = candles.close
         
         # Calculate ATR for distance validation
         self._calculate_atr(instrument, candles)
         
         # Update previous day levels
-        self._update_previous_day_levels(instrument, close_prices, candles)
+        self._update_previous_day_levels(instrument, candles, now)
         
         # Skip historical levels analysis for now - will be handled by signal generator
         historical_levels = []
         
-        print(f"📅 {instrument}: Analyzing current swing patterns")
-        
-        current_price = close_prices[-1]
-        print(f"\n📊 {instrument} Analysis:")
-        print(f"   Current: {current_price:.4f}")
-        print(f"   Volatility: {self.atr_values.get(instrument, 0):.4f}")
-        print(f"   Historical levels: {len(historical_levels)}")
+        current_price = float(close_prices[-1])
         
         # Detect swing highs and lows ON LINE GRAPH (using close prices)
-        swing_highs, swing_lows = self._detect_swings_line_graph(close_prices, candles)
+        if swings is None:
+            swings = self._detect_swings_line_graph(candles)
+        swing_highs, swing_lows = swings
         
-        print(f"   Swing Highs: {len(swing_highs)}, Swing Lows: {len(swing_lows)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📅 %s: Analyzing current swing patterns", instrument)
+            logger.debug("📊 %s Analysis:", instrument)
+            logger.debug("   Current: %.4f", current_price)
+            logger.debug("   Volatility: %.4f", self.atr_values.get(instrument, 0))
+            logger.debug("   Historical levels: %d", len(historical_levels))
+            logger.debug("   Swing Highs: %d, Swing Lows: %d", swing_highs.indices.size, swing_lows.indices.size)
+        
+        # One read of the recent closes and swing tails, shared by every detector
+        context = self._tail_context(close_prices, swing_highs, swing_lows, self.atr_values.get(instrument), now)
         
         # Use previous day levels from internal storage
         levels = self.previous_day_levels.get(instrument, {})
@@ -83,184 +203,190 @@ class StructureDetector:
             pdl = levels['low']
             pdh_broken = levels.get('high_broken', False)
             pdl_broken = levels.get('low_broken', False)
+            pdh_zone = levels['high_zone']
+            pdl_zone = levels['low_zone']
             
             # Check for CHOCH setups at PDH (not broken)
             if pdh and not pdh_broken:
-                choch_signal = self._detect_choch_at_high(close_prices, pdh, swing_lows, instrument, candles)
+                choch_signal = self._detect_choch_at_high(context, pdh_zone, instrument)
                 if choch_signal:
-                    print(f"   ✅ CHOCH SELL signal detected at PDH!")
+                    logger.info("   ✅ [%s] CHOCH SELL signal detected at PDH!", instrument)
                     signals.append(choch_signal)
             
             # Check for CHOCH setups at PDL (not broken)
             if pdl and not pdl_broken:
-                choch_signal = self._detect_choch_at_low(close_prices, pdl, swing_highs, instrument, candles)
+                choch_signal = self._detect_choch_at_low(context, pdl_zone, instrument)
                 if choch_signal:
-                    print(f"   ✅ CHOCH BUY signal detected at PDL!")
+                    logger.info("   ✅ [%s] CHOCH BUY signal detected at PDL!", instrument)
                     signals.append(choch_signal)
             
             # Check for BOS setups when PDH is broken
             if pdh and pdh_broken:
-                bos_signal = self._detect_bos_after_high_break(close_prices, pdh, swing_highs, instrument, candles)
+                bos_signal = self._detect_bos_after_high_break(context, pdh_zone, instrument)
                 if bos_signal:
-                    print(f"   ✅ BOS BUY signal detected after PDH break!")
+                    logger.info("   ✅ [%s] BOS BUY signal detected after PDH break!", instrument)
                     signals.append(bos_signal)
             
             # Check for BOS setups when PDL is broken
             if pdl and pdl_broken:
-                bos_signal = self._detect_bos_after_low_break(close_prices, pdl, swing_lows, instrument, candles)
+                bos_signal = self._detect_bos_after_low_break(context, pdl_zone, instrument)
                 if bos_signal:
-                    print(f"   ✅ BOS SELL signal detected after PDL break!")
+                    logger.info("   ✅ [%s] BOS SELL signal detected after PDL break!", instrument)
                     signals.append(bos_signal)
         
         # MICRO SWING ANALYSIS - Check recent small swings for immediate opportunities
-        if len(swing_highs) > 0 and len(swing_lows) > 0:
+        if swing_highs.indices.size > 0 and swing_lows.indices.size > 0:
             # Get most recent micro swings (last 20 candles)
-            recent_swing_highs = [sh for sh in swing_highs if sh['index'] >= len(close_prices) - 20]
-            recent_swing_lows = [sl for sl in swing_lows if sl['index'] >= len(close_prices) - 20]
+            recent_swing_highs = context['swing_highs_20']
+            recent_swing_lows = context['swing_lows_20']
             
             # Check for micro CHOCH/BOS patterns
-            for swing_high in recent_swing_highs[-3:]:  # Last 3 swing highs
-                if current_price < swing_high['price'] * 0.999:  # Small tolerance
-                    # Look for swing low break after touching swing high
-                    for swing_low in recent_swing_lows:
-                        if swing_low['index'] > swing_high['index'] and current_price < swing_low['price']:
-                            # Stop loss above the swing high
-                            ref_level = swing_high['price']
-                            micro_signal = {
-                                'instrument': instrument,
-                                'setup_type': 'MICRO_CHOCH',
-                                'direction': 'SELL',
-                                'entry_price': current_price,
-                                'stop_loss': ref_level * 1.002,  # SL above highest reference point
-                                'reference_level': swing_high['price'],
-                                'swing_break_level': swing_low['price'],
-                                'timestamp': datetime.now()
-                            }
-                            signals.append(micro_signal)
-                            print(f"   ✅ MICRO CHOCH SELL at swing high {swing_high['price']:.4f}")
-                            break
+            for i in range(max(recent_swing_highs.indices.size - 3, 0), recent_swing_highs.indices.size):  # Last 3 swing highs
+                ref_level = float(recent_swing_highs.prices[i])
+                if current_price < ref_level * 0.999:  # Small tolerance
+                    # First swing low after touching the swing high that price closed below
+                    broken = np.flatnonzero(
+                        (recent_swing_lows.indices > recent_swing_highs.indices[i])
+                        & (recent_swing_lows.prices > current_price)
+                    )
+                    if broken.size:
+                        # Stop loss above the swing high
+                        micro_signal = Signal(
+                            instrument=instrument,
+                            setup_type='MICRO_CHOCH',
+                            direction='SELL',
+                            entry_price=current_price,
+                            stop_loss=ref_level * 1.002,  # SL above highest reference point
+                            reference_level=ref_level,
+                            swing_break_level=float(recent_swing_lows.prices[broken[0]]),
+                            timestamp=now
+                        )
+                        signals.append(micro_signal)
+                        logger.info("   ✅ [%s] MICRO CHOCH SELL at swing high %.4f", instrument, ref_level)
             
-            for swing_low in recent_swing_lows[-3:]:  # Last 3 swing lows
-                if current_price > swing_low['price'] * 1.001:  # Small tolerance
-                    # Look for swing high break after touching swing low
-                    for swing_high in recent_swing_highs:
-                        if swing_high['index'] > swing_low['index'] and current_price > swing_high['price']:
-                            # Stop loss below the swing low
-                            ref_level = swing_low['price']
-                            micro_signal = {
-                                'instrument': instrument,
-                                'setup_type': 'MICRO_CHOCH',
-                                'direction': 'BUY',
-                                'entry_price': current_price,
-                                'stop_loss': ref_level * 0.998,  # SL below lowest reference point
-                                'reference_level': swing_low['price'],
-                                'swing_break_level': swing_high['price'],
-                                'timestamp': datetime.now()
-                            }
-                            signals.append(micro_signal)
-                            print(f"   ✅ MICRO CHOCH BUY at swing low {swing_low['price']:.4f}")
-                            break
-        
-        # Filter out duplicate signals (within 10 candles) - DISABLED FOR TESTING
-        # signals = self._filter_duplicate_signals(instrument, signals)
-        print(f"   📊 Final signal count for {instrument}: {len(signals)}")
+            for i in range(max(recent_swing_lows.indices.size - 3, 0), recent_swing_lows.indices.size):  # Last 3 swing lows
+                ref_level = float(recent_swing_lows.prices[i])
+                if current_price > ref_level * 1.001:  # Small tolerance
+                    # First swing high after touching the swing low that price closed above
+                    broken = np.flatnonzero(
+                        (recent_swing_highs.indices > recent_swing_lows.indices[i])
+                        & (recent_swing_highs.prices < current_price)
+                    )
+                    if broken.size:
+                        # Stop loss below the swing low
+                        micro_signal = Signal(
+                            instrument=instrument,
+                            setup_type='MICRO_CHOCH',
+                            direction='BUY',
+                            entry_price=current_price,
+                            stop_loss=ref_level * 0.998,  # SL below lowest reference point
+                            reference_level=ref_level,
+                            swing_break_level=float(recent_swing_highs.prices[broken[0]]),
+                            timestamp=now
+                        )
+                        signals.append(micro_signal)
+                        logger.info("   ✅ [%s] MICRO CHOCH BUY at swing low %.4f", instrument, ref_level)
         
         return signals
 
-    def _filter_duplicate_signals(self, instrument: str, signals: List[Dict]) -> List[Dict]:
-        """Prevent duplicate signals within short time period - RELAXED FOR TESTING"""
-        if not signals:
-            return signals
-        
-        last_time = self.last_signal_time.get(instrument, 0)
-        current_time = datetime.now().timestamp()
-        
-        # Reduced from 30 minutes to 5 minutes for more signals
-        if current_time - last_time < 300:  # 5 minutes
-            print(f"   ⏸️ Skipping duplicate signal (last signal {(current_time - last_time)/60:.1f} min ago)")
-            return []
-        
-        self.last_signal_time[instrument] = current_time
-        return signals
-
-    def _calculate_atr(self, instrument: str, candles: List[Dict], period: int = 14):
-        """Calculate volatility using CLOSE PRICES ONLY for line chart"""
-        if len(candles) < period + 1:
-            return
-        
-        # Use close-to-close price changes for line chart volatility
-        price_changes = []
+    def _filter_duplicate_signals(self, instrument: str, signals: List[Signal], current_time: float) -> List[Signal]:
+        """
+        Prevent duplicate signals within short time period - RELAXED FOR TESTING
         
-        for i in range(1, len(candles)):
-            current_close = candles[i]['close']
-            prev_close = candles[i-1]['close']
+        current_time is time.monotonic() for the tick, so wall-clock steps (NTP,
+        DST) can't shorten or stretch the spacing. Spacing is tracked per setup
+        type and direction, so a BOS doesn't suppress a CHOCH that follows it.
+        """
+        filtered = []
+        for signal in signals:
+            key = (instrument, signal.setup_type, signal.direction)
+            last_time = self.last_signal_time.get(key)
             
-            price_change = abs(current_close - prev_close)
-            price_changes.append(price_change)
+            # Reduced from 30 minutes to 5 minutes for more signals
+            if last_time is not None and current_time - last_time < 300:  # 5 minutes
+                logger.debug("   ⏸️ Skipping duplicate %s %s (last one %.1f min ago)",
+                             signal.setup_type, signal.direction, (current_time - last_time) / 60)
+                continue
+            
+            self.last_signal_time[key] = current_time
+            filtered.append(signal)
         
-        if len(price_changes) >= period:
-            # Average price change as volatility measure
-            volatility = sum(price_changes[-period:]) / period
-            self.atr_values[instrument] = volatility
+        return filtered
 
-    def _is_bos_too_far(self, instrument: str, reference_level: float, bos_level: float, direction: str) -> bool:
-        """Determine if BOS formation is too far from the reference level using ATR"""
-        atr = self.atr_values.get(instrument)
-        
-        if atr is None:
-            distance = abs(bos_level - reference_level)
-            max_distance = reference_level * 0.02  # 2% fallback
-            return distance > max_distance
-        
-        distance = abs(bos_level - reference_level)
-        
-        # Increased multiplier to allow more trades - was 2.0, now 3.0
-        atr_multiplier = 3.0
-        max_allowed_distance = atr * atr_multiplier
-        
-        is_too_far = distance > max_allowed_distance
-        
-        if is_too_far:
-            print(f"   ⚠️ BOS too far: Distance {distance:.4f} > Max {max_allowed_distance:.4f} ({atr_multiplier}x ATR)")
-        else:
-            print(f"   ✅ BOS distance OK: {distance:.4f} <= {max_allowed_distance:.4f}")
-        
-        return is_too_far
+    def _ensure_arrays(self, candles) -> Candles:
+        """Pass Candles through unchanged; convert a legacy list of candle dicts once"""
+        if isinstance(candles, Candles):
+            return candles
+        return candles_from_dicts(candles)
 
-    def _calculate_distance_ratio(self, instrument: str, reference_level: float, bos_level: float) -> float:
-        """Calculate how many ATRs away the BOS is from the reference level"""
-        atr = self.atr_values.get(instrument)
+    def _calculate_atr(self, instrument: str, candles: Candles, period: int = 14):
+        """
+        Calculate volatility using CLOSE PRICES ONLY for line chart
         
-        if atr is None or atr == 0:
-            return 0
+        Seeded with the average of the last `period` close-to-close changes, then
+        updated with Wilder's smoothing for each candle that arrived since the
+        previous call - O(new candles) per tick instead of a rescan.
+        """
+        close_prices = candles.close
+        if len(close_prices) < period + 1:
+            return
         
-        distance = abs(bos_level - reference_level)
-        ratio = distance / atr
+        # Locate the last candle we smoothed in; everything after it is new
+        new_candles = None
+        state = self._atr_state.get(instrument)
+        if state is not None:
+            pos = int(np.searchsorted(candles.time, state['last_time']))
+            if pos < len(close_prices) and candles.time[pos] == state['last_time']:
+                new_candles = len(close_prices) - 1 - pos
+        
+        if new_candles is None:
+            # First call or the window no longer overlaps: seed from the last `period` changes
+            atr = float(np.abs(np.diff(close_prices[-(period + 1):])).mean())
+        else:
+            atr = state['atr']
+            if new_candles:
+                for price_change in np.abs(np.diff(close_prices[-(new_candles + 1):])).tolist():
+                    atr = (atr * (period - 1) + price_change) / period
         
-        return ratio
+        self._atr_state[instrument] = {'atr': atr, 'last_time': candles.time[-1]}
+        self.atr_values[instrument] = atr
 
-    def _update_previous_day_levels(self, instrument: str, close_prices: List[float], candles: List[Dict]):
+    def _update_previous_day_levels(self, instrument: str, candles: Candles, now: datetime):
         """
         Update or create previous day high/low levels
         ✅ USES LINE GRAPH (close prices only for highs/lows)
-        """
-        if len(close_prices) < 288:
-            return
         
-        # Get yesterday's close prices (288 candles = 24 hours on 5min)
-        yesterday_closes = close_prices[-576:-288] if len(close_prices) >= 576 else close_prices[-288:]
-        
-        if not yesterday_closes:
-            return
+        The previous day is the last UTC date with candles before the latest
+        candle's date. Its high/low only change when that date rolls over, so
+        they are cached per date; the broken flags are refreshed every call.
+        """
+        close_prices = candles.close
+        today = candles.time[-1].astype('datetime64[D]')
         
-        # Calculate previous day high and low FROM LINE GRAPH
-        pdh = max(yesterday_closes)
-        pdl = min(yesterday_closes)
+        cached = self._pdh_pdl_cache.get(instrument)
+        if cached is not None and cached['date'] == today:
+            pdh = cached['pdh']
+            pdl = cached['pdl']
+        else:
+            # Yesterday's candles via binary search on the candle times
+            end = int(np.searchsorted(candles.time, today))
+            if end == 0:
+                return
+            start = int(np.searchsorted(candles.time, candles.time[end - 1].astype('datetime64[D]')))
+            yesterday_closes = close_prices[start:end]
+            
+            # Calculate previous day high and low FROM LINE GRAPH
+            pdh = float(yesterday_closes.max())
+            pdl = float(yesterday_closes.min())
+            
+            # Only cache a complete day - a window starting mid-day would pin a partial range
+            if start > 0:
+                self._pdh_pdl_cache[instrument] = {'date': today, 'pdh': pdh, 'pdl': pdl}
         
         # Check if levels are broken (using recent close prices)
         recent_closes = close_prices[-100:]
-        current_high = max(recent_closes)
-        current_low = min(recent_closes)
+        current_high = float(recent_closes.max())
+        current_low = float(recent_closes.min())
         
         pdh_broken = current_high > pdh
         pdl_broken = current_low < pdl
@@ -270,259 +396,294 @@ class StructureDetector:
             'low': pdl,
             'high_broken': pdh_broken,
             'low_broken': pdl_broken,
-            'updated_at': datetime.now()
+            'high_zone': self._level_zone(pdh),
+            'low_zone': self._level_zone(pdl),
+            'updated_at': now
         }
 
-    def _detect_swings_line_graph(self, close_prices: List[float], candles: List[Dict], lookback: int = 1) -> tuple:
+    def _level_zone(self, level: float) -> Dict:
+        """
+        A level with its tolerance thresholds, computed once per level update
+        
+        touch_low/touch_high: 2% band used for touch checks
+        stop_low/stop_high: 0.2% band used for stop losses
+        """
+        return {
+            'level': level,
+            'touch_low': level * 0.98,
+            'touch_high': level * 1.02,
+            'stop_low': level * 0.998,
+            'stop_high': level * 1.002
+        }
+
+    def _detect_swings_line_graph(self, candles: Candles, lookback: int = 1) -> tuple:
         """
         Detect ALL swing highs and swing lows ON LINE GRAPH - NO MATTER HOW SMALL
         ✅ LOOKBACK = 1 for maximum sensitivity (every local peak/valley)
         
         Args:
-            close_prices: List of close prices (line graph)
-            candles: Original candle data (for timestamps)
+            candles: Candles arrays (close prices form the line graph, times are reported)
             lookback: Number of candles to look back (1 for all swings)
         
         Returns:
-            Tuple of (swing_highs, swing_lows)
-        """
-        swing_highs = []
-        swing_lows = []
-        
-        for i in range(lookback, len(close_prices) - lookback):
-            # Check for swing high - ANY local peak
-            is_swing_high = True
-            for j in range(1, lookback + 1):
-                if close_prices[i] <= close_prices[i - j] or close_prices[i] <= close_prices[i + j]:
-                    is_swing_high = False
-                    break
-            
-            if is_swing_high:
-                swing_highs.append({
-                    'price': close_prices[i],
-                    'index': i,
-                    'time': candles[i]['time'] if i < len(candles) else None
-                })
-            
-            # Check for swing low - ANY local valley
-            is_swing_low = True
-            for j in range(1, lookback + 1):
-                if close_prices[i] >= close_prices[i - j] or close_prices[i] >= close_prices[i + j]:
-                    is_swing_low = False
-                    break
+            Tuple of (swing_highs, swing_lows) as SwingArray
+        """
+        prices = candles.close
+        n = len(prices)
+        if n < 2 * lookback + 1:
+            no_swings = np.empty(0, dtype=np.int64)
+            return self._swing_array(candles, no_swings), self._swing_array(candles, no_swings)
+        
+        if NUMBA_AVAILABLE:
+            # Compiled loop with early exit per candidate
+            high_idx, low_idx = find_swings(prices, lookback)
+        else:
+            # Compare every candidate against its j-th neighbor on each side at once
+            centers = prices[lookback:n - lookback]
+            neighbors = [prices[lookback - j:n - lookback - j] for j in range(1, lookback + 1)]
+            neighbors += [prices[lookback + j:n - lookback + j] for j in range(1, lookback + 1)]
             
-            if is_swing_low:
-                swing_lows.append({
-                    'price': close_prices[i],
-                    'index': i,
-                    'time': candles[i]['time'] if i < len(candles) else None
-                })
-        
-        return swing_highs, swing_lows
+            # Swing high - ANY local peak; swing low - ANY local valley
+            high_idx = np.flatnonzero(centers > np.maximum.reduce(neighbors)) + lookback
+            low_idx = np.flatnonzero(centers < np.minimum.reduce(neighbors)) + lookback
+        
+        return self._swing_array(candles, high_idx), self._swing_array(candles, low_idx)
 
-    def _detect_choch_at_high(self, close_prices: List[float], pdh: float, swing_lows: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
-        """
-        Detect CHOCH (reversal) at previous day high
-        ✅ USES LINE GRAPH - close prices only
+    def _swing_array(self, candles: Candles, indices: np.ndarray) -> SwingArray:
+        """Gather the closes and times at the given swing indices"""
+        indices = indices.astype(np.int64, copy=False)
+        return SwingArray(prices=candles.close[indices], indices=indices, times=candles.time[indices])
+
+    def _tail_context(self, close_prices: np.ndarray, swing_highs: SwingArray, swing_lows: SwingArray,
+                      atr: Optional[float], now: datetime) -> Optional[Dict]:
         """
-        if len(close_prices) < 20:
-            return None
-        
-        recent_closes = close_prices[-20:]
-        current_price = recent_closes[-1]
+        Reduce the recent closes once for all detectors in a tick
         
-        # Check if price recently touched PDH (very loose tolerance - 2%)
-        touched_pdh = any(price >= pdh * 0.98 for price in recent_closes)
-        
-        if not touched_pdh:
-            return None
-        
-        # Find the most recent swing low after touching PDH
-        recent_swing_lows = [sl for sl in swing_lows if sl['index'] >= len(close_prices) - 20]
-        
-        if not recent_swing_lows:
+        A touch or break check only needs its window's extreme (any close
+        >= x is the same as max >= x), so each window is reduced here once and
+        every level, including the flipped ones, compares against the scalars.
+        The ATR-derived BOS limits are folded in here too, so the BOS checks
+        are plain arithmetic.
+        """
+        n = len(close_prices)
+        if n < 30:
             return None
         
-        latest_swing_low = recent_swing_lows[-1]
-        
-        # Wait for CANDLE CLOSE below swing low (CHOCH confirmation)
-        if current_price < latest_swing_low['price']:
-            # Stop loss above the reference level (PDH or historical high)
-            stop_loss = pdh * 1.002  # 0.2% above reference level
-            
-            print(f"   🎯 CHOCH SELL: Entry={current_price:.4f}, SL={stop_loss:.4f}, Swing={latest_swing_low['price']:.4f}")
-            
-            return {
-                'instrument': instrument,
-                'setup_type': 'CHOCH',
-                'direction': 'SELL',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdh,
-                'swing_break_level': latest_swing_low['price'],
-                'timestamp': datetime.now()
-            }
+        recent_closes = close_prices[-30:]
+        touch_window = recent_closes[-20:]  # CHOCH: last 20 closes
+        break_window = recent_closes[:20]  # BOS: first 20 of the last 30
+        
+        return {
+            'current_price': float(recent_closes[-1]),
+            'high_20': float(touch_window.max()),
+            'low_20': float(touch_window.min()),
+            'break_high': float(break_window.max()),
+            'break_low': float(break_window.min()),
+            'swing_highs_20': self._swings_since(swing_highs, n - 20),
+            'swing_lows_20': self._swings_since(swing_lows, n - 20),
+            'swing_highs_30': self._swings_since(swing_highs, n - 30),
+            'swing_lows_30': self._swings_since(swing_lows, n - 30),
+            # Increased multiplier to allow more trades - was 2.0, now 3.0
+            'max_bos_distance': atr * 3.0 if atr is not None else None,
+            'inv_atr': 1.0 / atr if atr else 0.0,  # distance * inv_atr = distance in ATRs
+            'timestamp': now  # Shared by every signal from this tick
+        }
+
+    def _swings_since(self, swings: SwingArray, start_index: int) -> SwingArray:
+        """
+        Swings at or after start_index
         
-        return None
+        Swing indices come out of _detect_swings_line_graph sorted, so the
+        cutoff is a binary search and the result is a view of each array.
+        """
+        cut = int(np.searchsorted(swings.indices, start_index, side='left'))
+        return SwingArray(prices=swings.prices[cut:], indices=swings.indices[cut:], times=swings.times[cut:])
 
-    def _detect_choch_at_low(self, close_prices: List[float], pdl: float, swing_highs: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
+    def _detect_choch_at_high(self, context: Optional[Dict], zone: Dict, instrument: str) -> Optional[Signal]:
+        """
+        Detect CHOCH (reversal) at previous day high
+        ✅ USES LINE GRAPH - close prices only
+        """
+        return self._choch_core(context, zone, 'SELL', instrument)
+
+    def _detect_choch_at_low(self, context: Optional[Dict], zone: Dict, instrument: str) -> Optional[Signal]:
         """
         Detect CHOCH (reversal) at previous day low
         ✅ USES LINE GRAPH - close prices only
         """
-        if len(close_prices) < 20:
-            return None
-        
-        recent_closes = close_prices[-20:]
-        current_price = recent_closes[-1]
-        
-        # Check if price recently touched PDL (very loose tolerance - 2%)
-        touched_pdl = any(price <= pdl * 1.02 for price in recent_closes)
+        return self._choch_core(context, zone, 'BUY', instrument)
+
+    def _choch_core(self, context: Optional[Dict], zone: Dict, direction: str, instrument: str) -> Optional[Signal]:
+        """
+        CHOCH check shared by the PDH/PDL and flipped-level detectors
         
-        if not touched_pdl:
+        SELL: closes touched the level (resistance), then closed below the latest swing low
+        BUY: closes touched the level (support), then closed above the latest swing high
+        """
+        if context is None:
             return None
         
-        # Find the most recent swing high after touching PDL
-        recent_swing_highs = [sh for sh in swing_highs if sh['index'] >= len(close_prices) - 20]
+        current_price = context['current_price']
         
-        if not recent_swing_highs:
-            return None
+        # Check if price recently touched the level (very loose tolerance - 2%)
+        if direction == 'SELL':
+            touched = context['high_20'] >= zone['touch_low']
+            recent_swings = context['swing_lows_20']  # Swing lows after the touch
+        else:
+            touched = context['low_20'] <= zone['touch_high']
+            recent_swings = context['swing_highs_20']  # Swing highs after the touch
         
-        latest_swing_high = recent_swing_highs[-1]
+        if not touched or recent_swings.indices.size == 0:
+            return None
         
-        # Wait for CANDLE CLOSE above swing high (CHOCH confirmation)
-        if current_price > latest_swing_high['price']:
-            # Stop loss below the reference level (PDL or historical low)
-            stop_loss = pdl * 0.998  # 0.2% below reference level
-            
-            print(f"   🎯 CHOCH BUY: Entry={current_price:.4f}, SL={stop_loss:.4f}, Swing={latest_swing_high['price']:.4f}")
-            
-            return {
-                'instrument': instrument,
-                'setup_type': 'CHOCH',
-                'direction': 'BUY',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdl,
-                'swing_break_level': latest_swing_high['price'],
-                'timestamp': datetime.now()
-            }
+        swing_break_level = float(recent_swings.prices[-1])
         
-        return None
+        # Wait for CANDLE CLOSE beyond the latest swing (CHOCH confirmation)
+        if direction == 'SELL':
+            if current_price >= swing_break_level:
+                return None
+            stop_loss = zone['stop_high']  # 0.2% above reference level
+        else:
+            if current_price <= swing_break_level:
+                return None
+            stop_loss = zone['stop_low']  # 0.2% below reference level
+        
+        logger.debug("   🎯 CHOCH %s: Entry=%.4f, SL=%.4f, Swing=%.4f", direction, current_price, stop_loss, swing_break_level)
+        
+        return Signal(
+            instrument=instrument,
+            setup_type='CHOCH',
+            direction=direction,
+            entry_price=current_price,
+            stop_loss=stop_loss,
+            reference_level=zone['level'],
+            swing_break_level=swing_break_level,
+            timestamp=context['timestamp']
+        )
 
-    def _detect_bos_after_high_break(self, close_prices: List[float], pdh: float, swing_highs: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
+    def _detect_bos_after_high_break(self, context: Optional[Dict], zone: Dict, instrument: str) -> Optional[Signal]:
         """
         Detect BOS (continuation) after PDH is broken
         ✅ USES LINE GRAPH - close prices only
         """
-        if len(close_prices) < 30:
+        if context is None:
             return None
         
-        recent_closes = close_prices[-30:]
-        current_price = recent_closes[-1]
+        pdh = zone['level']
+        current_price = context['current_price']
         
         # Check if PDH was recently broken
-        broken_pdh = any(price > pdh for price in recent_closes[:20])
+        broken_pdh = context['break_high'] > pdh
         
         if not broken_pdh:
             return None
         
         # Find recent swing high after breaking PDH
-        recent_swing_highs = [sh for sh in swing_highs if sh['index'] >= len(close_prices) - 30]
+        recent_swing_highs = context['swing_highs_30']
         
-        if not recent_swing_highs:
+        if recent_swing_highs.indices.size == 0:
             return None
         
-        latest_swing_high = recent_swing_highs[-1]
-        bos_level = latest_swing_high['price']
+        bos_level = float(recent_swing_highs.prices[-1])
         
-        # Check if BOS is too far using ATR-based logic
-        if self._is_bos_too_far(instrument, pdh, bos_level, direction='UP'):
+        distance = abs(bos_level - pdh)
+        
+        # Check if BOS is too far using ATR-based logic (2% of the level without ATR)
+        max_distance = context['max_bos_distance']
+        if max_distance is None:
+            max_distance = pdh * 0.02
+        if distance > max_distance:
+            logger.debug("   ⚠️ BOS too far: Distance %.4f > Max %.4f", distance, max_distance)
             return None
         
         # Wait for CANDLE CLOSE above swing high (BOS confirmation)
-        if current_price > latest_swing_high['price']:
+        if current_price > bos_level:
             # Stop loss below the broken reference level
-            stop_loss = pdh * 0.998  # 0.2% below reference level
+            stop_loss = zone['stop_low']  # 0.2% below reference level
             
-            distance_ratio = self._calculate_distance_ratio(instrument, pdh, bos_level)
+            distance_ratio = distance * context['inv_atr']
             
-            print(f"   🎯 BOS BUY: Entry={current_price:.4f}, SL={stop_loss:.4f}, Distance={distance_ratio:.2f}x ATR")
+            logger.debug("   🎯 BOS BUY: Entry=%.4f, SL=%.4f, Distance=%.2fx ATR", current_price, stop_loss, distance_ratio)
             
-            return {
-                'instrument': instrument,
-                'setup_type': 'BOS',
-                'direction': 'BUY',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdh,
-                'swing_break_level': latest_swing_high['price'],
-                'distance_ratio': distance_ratio,
-                'timestamp': datetime.now()
-            }
+            return Signal(
+                instrument=instrument,
+                setup_type='BOS',
+                direction='BUY',
+                entry_price=current_price,
+                stop_loss=stop_loss,
+                reference_level=pdh,
+                swing_break_level=bos_level,
+                distance_atr_ratio=distance_ratio,
+                timestamp=context['timestamp']
+            )
         
         return None
 
-    def _detect_bos_after_low_break(self, close_prices: List[float], pdl: float, swing_lows: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
+    def _detect_bos_after_low_break(self, context: Optional[Dict], zone: Dict, instrument: str) -> Optional[Signal]:
         """
         Detect BOS (continuation) after PDL is broken
         ✅ USES LINE GRAPH - close prices only
         """
-        if len(close_prices) < 30:
+        if context is None:
             return None
         
-        recent_closes = close_prices[-30:]
-        current_price = recent_closes[-1]
+        pdl = zone['level']
+        current_price = context['current_price']
         
         # Check if PDL was recently broken
-        broken_pdl = any(price < pdl for price in recent_closes[:20])
+        broken_pdl = context['break_low'] < pdl
         
         if not broken_pdl:
             return None
         
         # Find recent swing low after breaking PDL
-        recent_swing_lows = [sl for sl in swing_lows if sl['index'] >= len(close_prices) - 30]
+        recent_swing_lows = context['swing_lows_30']
         
-        if not recent_swing_lows:
+        if recent_swing_lows.indices.size == 0:
             return None
         
-        latest_swing_low = recent_swing_lows[-1]
-        bos_level = latest_swing_low['price']
+        bos_level = float(recent_swing_lows.prices[-1])
+        
+        distance = abs(bos_level - pdl)
         
-        # Check if BOS is too far using ATR-based logic
-        if self._is_bos_too_far(instrument, pdl, bos_level, direction='DOWN'):
+        # Check if BOS is too far using ATR-based logic (2% of the level without ATR)
+        max_distance = context['max_bos_distance']
+        if max_distance is None:
+            max_distance = pdl * 0.02
+        if distance > max_distance:
+            logger.debug("   ⚠️ BOS too far: Distance %.4f > Max %.4f", distance, max_distance)
             return None
         
         # Wait for CANDLE CLOSE below swing low (BOS confirmation)
-        if current_price < latest_swing_low['price']:
+        if current_price < bos_level:
             # Stop loss above the broken reference level
-            stop_loss = pdl * 1.002  # 0.2% above reference level
+            stop_loss = zone['stop_high']  # 0.2% above reference level
             
-            distance_ratio = self._calculate_distance_ratio(instrument, pdl, bos_level)
+            distance_ratio = distance * context['inv_atr']
             
-            print(f"   🎯 BOS SELL: Entry={current_price:.4f}, SL={stop_loss:.4f}, Distance={distance_ratio:.2f}x ATR")
+            logger.debug("   🎯 BOS SELL: Entry=%.4f, SL=%.4f, Distance=%.2fx ATR", current_price, stop_loss, distance_ratio)
             
-            return {
-                'instrument': instrument,
-                'setup_type': 'BOS',
-                'direction': 'SELL',
-                'entry_price': current_price,
-                'stop_loss': stop_loss,
-                'reference_level': pdl,
-                'swing_break_level': latest_swing_low['price'],
-                'distance_ratio': distance_ratio,
-                'timestamp': datetime.now()
-            }
+            return Signal(
+                instrument=instrument,
+                setup_type='BOS',
+                direction='SELL',
+                entry_price=current_price,
+                stop_loss=stop_loss,
+                reference_level=pdl,
+                swing_break_level=bos_level,
+                distance_atr_ratio=distance_ratio,
+                timestamp=context['timestamp']
+            )
         
         return None
 
-    def _detect_choch_at_flipped_high(self, close_prices: List[float], pdh: float, swing_highs: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
+    def _detect_choch_at_flipped_high(self, context: Optional[Dict], pdh_zone: Dict, instrument: str) -> Optional[Signal]:
         """Detect CHOCH at flipped PDH (now acting as support)"""
-        return self._detect_choch_at_low(close_prices, pdh, swing_highs, instrument, candles)
+        return self._choch_core(context, pdh_zone, 'BUY', instrument)
 
-    def _detect_choch_at_flipped_low(self, close_prices: List[float], pdl: float, swing_lows: List[Dict], instrument: str, candles: List[Dict]) -> Optional[Dict]:
+    def _detect_choch_at_flipped_low(self, context: Optional[Dict], pdl_zone: Dict, instrument: str) -> Optional[Signal]:
         """Detect CHOCH at flipped PDL (now acting as resistance)"""
-        return self._detect_choch_at_high(close_prices, pdl, swing_lows, instrument, candles)
+        return self._choch_core(context, pdl_zone, 'SELL', instrument)
 
     def get_previous_day_levels(self, instrument: str) -> Dict:
         """Get stored previous day levels for an instrument"""
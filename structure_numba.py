@@ -0,0 +1,122 @@
+"""
+Numba Swing Detection Kernel
+Compiled swing detection over closing prices (line chart method)
+Numba is optional - NUMBA_AVAILABLE tells callers whether the kernel is compiled
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator - leaves the function as plain Python"""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True, nogil=True)
+def find_swings(closes, lookback):
+    """
+    Find swing high and swing low indices on closing prices
+
+    A swing high is strictly greater than the `lookback` closes on both sides,
+    a swing low strictly lower.
+
+    Args:
+        closes: 1-D float64 array of closing prices
+        lookback: Number of candles to compare on each side
+
+    Returns:
+        Tuple of (swing_high_indices, swing_low_indices) as int64 arrays
+    """
+    n = closes.shape[0]
+    is_high = np.zeros(n, dtype=np.bool_)
+    is_low = np.zeros(n, dtype=np.bool_)
+
+    for i in range(lookback, n - lookback):
+        current_close = closes[i]
+
+        swing_high = True
+        for j in range(1, lookback + 1):
+            if current_close <= closes[i - j] or current_close <= closes[i + j]:
+                swing_high = False
+                break
+        is_high[i] = swing_high
+
+        swing_low = True
+        for j in range(1, lookback + 1):
+            if current_close >= closes[i - j] or current_close >= closes[i + j]:
+                swing_low = False
+                break
+        is_low[i] = swing_low
+
+    return np.nonzero(is_high)[0].astype(np.int64), np.nonzero(is_low)[0].astype(np.int64)
+
+
+@njit(cache=True, nogil=True)
+def detect_structure(highs, lows, closes, lookback, atr_period, day_start, day_end, recent_candles):
+    """
+    Compute swings, ATR and previous day levels in one compiled pass
+
+    Args:
+        highs, lows, closes: 1-D float64 candle arrays
+        lookback: Swing detection lookback (see find_swings)
+        atr_period: ATR period for Wilder's smoothing
+        day_start, day_end: Index range [start, end) of the previous day's candles
+        recent_candles: Window checked for PDH/PDL breaks
+
+    Returns:
+        Tuple of (swing_high_indices, swing_low_indices, atr, has_atr,
+        pdh, pdl, pdh_broken, pdl_broken, has_levels)
+    """
+    n = closes.shape[0]
+    high_idx, low_idx = find_swings(closes, lookback)
+
+    # ATR: Wilder's RMA seeded with the SMA of the first atr_period true ranges.
+    # TR is folded into the accumulator as it is computed - no TR array
+    atr = 0.0
+    has_atr = n >= atr_period + 1
+    if has_atr:
+        for i in range(1, n):
+            high = highs[i]
+            low = lows[i]
+            prev_close = closes[i - 1]
+
+            tr = high - low
+            gap = np.fabs(high - prev_close)
+            if gap > tr:
+                tr = gap
+            gap = np.fabs(low - prev_close)
+            if gap > tr:
+                tr = gap
+
+            if i <= atr_period:
+                atr += tr / atr_period
+            else:
+                atr += (tr - atr) / atr_period
+
+    # Previous day high/low and whether recent candles broke them
+    pdh = 0.0
+    pdl = 0.0
+    pdh_broken = False
+    pdl_broken = False
+    has_levels = day_end > day_start
+    if has_levels:
+        pdh = highs[day_start]
+        pdl = lows[day_start]
+        for i in range(day_start + 1, day_end):
+            pdh = max(pdh, highs[i])
+            pdl = min(pdl, lows[i])
+
+        for i in range(max(n - recent_candles, 0), n):
+            if highs[i] > pdh:
+                pdh_broken = True
+            if lows[i] < pdl:
+                pdl_broken = True
+
+    return high_idx, low_idx, atr, has_atr, pdh, pdl, pdh_broken, pdl_broken, has_levels
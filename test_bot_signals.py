@@ -18,6 +18,26 @@ def load_module(name, filename):
     spec.loader.exec_module(module)
     return module
 
+def check_empty_candles():
+    """Empty candle input yields no signals, even after levels are stored (offline)"""
+    import numpy as np
+    structure_detector_mod = load_module("structure_detector", "structure-detector.py")
+    
+    detector = structure_detector_mod.StructureDetector(None, ["EUR_USD"])
+    
+    # Two days of hourly candles so previous day levels get stored first
+    times = np.datetime64('2024-01-01T00:00') + np.arange(48) * np.timedelta64(1, 'h')
+    closes = 1.10 + 0.001 * np.sin(np.arange(48) / 3.0)
+    candles = structure_detector_mod.Candles(
+        time=times.astype('datetime64[ns]'), open=closes, high=closes + 0.0005,
+        low=closes - 0.0005, close=closes
+    )
+    detector.analyze("EUR_USD", candles)
+    
+    assert detector.analyze("EUR_USD", []) == []
+    assert detector.analyze("EUR_USD", structure_detector_mod.candles_from_dicts([])) == []
+    print("Empty candle check passed")
+
 async def test_bot():
     print("Testing Bot Signal Generation...")
     
@@ -39,44 +59,49 @@ async def test_bot():
         environment=os.getenv('OANDA_ENVIRONMENT', 'practice')
     )
     
-    # Test connection
     try:
-        account_info = await oanda_client.get_account_info()
-        print(f"Connected to OANDA - Balance: ${account_info['balance']}")
-    except Exception as e:
-        print(f"OANDA connection failed: {str(e)}")
-        return
-    
-    # Initialize modules
-    data_module = data_module_mod.DataModule(oanda_client, db)
-    structure_detector = structure_detector_mod.StructureDetector(oanda_client, ["NAS100_USD"])
-    news_filter = news_filter_mod.NewsFilter(enabled=False)
-    signal_generator = signal_generator_mod.SignalGenerator(structure_detector, data_module, news_filter, db)
-    
-    # Test signal generation for each instrument
-    instruments = ["NAS100_USD", "EU50_EUR", "JP225_USD", "USD_CAD", "USD_JPY"]
-    
-    for instrument in instruments:
-        print(f"\nTesting {instrument}...")
-        
+        # Test connection
         try:
-            # Initialize levels
-            await data_module._calculate_previous_day_levels(instrument)
-            
-            # Generate signals
-            signals = await signal_generator.generate_signals(instrument)
-            
-            print(f"{instrument}: Generated {len(signals)} signals")
+            account_info = await oanda_client.get_account_info()
+            print(f"Connected to OANDA - Balance: ${account_info['balance']}")
+        except Exception as e:
+            print(f"OANDA connection failed: {str(e)}")
+            return
+        
+        # Initialize modules
+        data_module = data_module_mod.DataModule(oanda_client, db)
+        structure_detector = structure_detector_mod.StructureDetector(oanda_client, ["NAS100_USD"])
+        news_filter = news_filter_mod.NewsFilter(enabled=False)
+        signal_generator = signal_generator_mod.SignalGenerator(structure_detector, data_module, news_filter, db)
+        
+        # Test signal generation for each instrument
+        instruments = ["NAS100_USD", "EU50_EUR", "JP225_USD", "USD_CAD", "USD_JPY"]
+        
+        for instrument in instruments:
+            print(f"\nTesting {instrument}...")
             
-            for signal in signals:
-                print(f"   {signal['setup_type']} {signal['direction']} - Entry: {signal['entry_price']:.4f}")
+            try:
+                # Initialize levels
+                await data_module._calculate_previous_day_levels(instrument)
                 
-        except Exception as e:
-            print(f"Error testing {instrument}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+                # Generate signals
+                signals = await signal_generator.generate_signals(instrument)
+                
+                print(f"{instrument}: Generated {len(signals)} signals")
+                
+                for signal in signals:
+                    print(f"   {signal.setup_type} {signal.direction} - Entry: {signal.entry_price:.4f}")
+                    
+            except Exception as e:
+                print(f"Error testing {instrument}: {str(e)}")
+                import traceback
+                traceback.print_exc()
+        
+        print("\nBot signal test completed!")
     
-    print("\nBot signal test completed!")
+    finally:
+        await oanda_client.close()
 
 if __name__ == "__main__":
+    check_empty_candles()
     asyncio.run(test_bot())
\ No newline at end of file
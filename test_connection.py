@@ -29,6 +29,7 @@ async def test_connection():
         print("Please set OANDA_API_KEY and OANDA_ACCOUNT_ID")
         return False
     
+    client = None
     try:
         # Initialize client
         client = OandaClient(api_key, account_id, environment)
@@ -68,6 +69,10 @@ async def test_connection():
     except Exception as e:
         print(f"❌ Connection failed: {str(e)}")
         return False
+    
+    finally:
+        if client is not None:
+            await client.close()
 
 if __name__ == "__main__":
     success = asyncio.run(test_connection())
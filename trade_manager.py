@@ -4,102 +4,349 @@ Handles trade monitoring, EOD closure, and trade lifecycle management
 """
 
 import asyncio
-from datetime import datetime, time
-from typing import Dict, List
-import pytz
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
 
 class TradeManager:
     def __init__(self, oanda_client, db):
         self.oanda_client = oanda_client
         self.db = db
-        self.broker_timezone = pytz.timezone('America/New_York')
+        self.broker_timezone = ZoneInfo('America/New_York')
         self.monitoring_active = False
+        
+        # Blocking sqlite calls run off the event loop on one worker thread, through a
+        # connection of its own (opened on that thread) to the same database file.
+        # The rest of the bot keeps using db.conn on the loop thread, so neither side
+        # can commit the other's half-finished transaction; sqlite serializes the writes
+        self._trade_db = type(db)(db.db_path)
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="trade-db", initializer=self._trade_db.initialize
+        )
+        
+        # Monitoring interval (seconds) scales with how close the nearest trade is to SL/TP
+        self.min_poll_interval = 2
+        self.max_poll_interval = 120
+        self.poll_seconds_per_pip = 1.0
+        
+        # Set when a trade opens or a streamed price reaches an open trade's SL/TP,
+        # so the next check runs without waiting out the interval
+        self._check_now = asyncio.Event()
+        
+        # (direction, stop_loss, take_profit) of open trades per instrument, refreshed
+        # each check; the price stream is subscribed to exactly these instruments
+        self._exit_levels = {}
+        self._instruments_changed = asyncio.Event()
+        
+        # Streamed prices of open trades go to the DB through a bounded queue (a full
+        # queue drops its oldest tick) and are written in one bulk update per batch
+        self._tick_queue = asyncio.Queue(maxsize=1024)
+        self.tick_flush_interval = 0.25
+        self.tick_batch_size = 128
+        self._open_positions = {}  # instrument -> still-open trades, refreshed each check
+        
+        # Pip size per instrument, looked up once from the client the first time
+        # an instrument has an open trade
+        self.pip_size = {}
+        
+        # Monitoring loop and its helper tasks while monitoring runs, so close() can stop them
+        self._monitor_task = None
+        self._stream_task = None
+        self._writer_task = None
+    
+    async def _db_call(self, method, *args, **kwargs):
+        """Run a blocking method of the DB thread's Database (self._trade_db) and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(method, *args, **kwargs))
     
     async def start_monitoring(self):
         """Start trade monitoring loop"""
         self.monitoring_active = True
-        print("👁️ Trade monitoring started")
+        logger.info("👁️ Trade monitoring started")
         
-        while self.monitoring_active:
-            try:
-                await self._monitor_trades()
-                # EOD closure disabled - trades only close on TP/SL or manual
-                await asyncio.sleep(30)  # Check every 30 seconds
-                
-            except Exception as e:
-                print(f"❌ Error in trade monitoring: {str(e)}")
-                await asyncio.sleep(60)
+        # Streamed prices trigger checks between the polls below
+        self._monitor_task = asyncio.current_task()
+        self._stream_task = asyncio.create_task(self._watch_price_stream())
+        self._writer_task = asyncio.create_task(self._write_streamed_prices())
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while self.monitoring_active:
+                try:
+                    started = loop.time()
+                    self._check_now.clear()
+                    interval = await self._monitor_trades()
+                    # EOD closure disabled - trades only close on TP/SL or manual
+                    
+                    # Sleep until the next check is due, or until a trade opens or hits SL/TP
+                    try:
+                        await asyncio.wait_for(self._check_now.wait(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    
+                    # Streamed SL/TP hits repeat every tick until the broker closes the
+                    # trade - keep checks at least min_poll_interval apart
+                    await asyncio.sleep(max(self.min_poll_interval - (loop.time() - started), 0))
+                    
+                except Exception as e:
+                    logger.error("❌ Error in trade monitoring: %s", e)
+                    await asyncio.sleep(60)
+        finally:
+            self._stream_task.cancel()
+            self._writer_task.cancel()
     
     def stop_monitoring(self):
         """Stop trade monitoring"""
         self.monitoring_active = False
-        print("⏹️ Trade monitoring stopped")
+        self._check_now.set()
+        self._instruments_changed.set()
+        logger.info("⏹️ Trade monitoring stopped")
     
-    async def _monitor_trades(self):
-        """Monitor all open trades for TP/SL hits"""
-        open_trades = self.db.get_open_trades()
+    async def close(self):
+        """
+        Shut the manager down: stop monitoring, cancel the monitoring, price stream and
+        DB writer tasks, then close the DB thread's connection and stop that thread
+        """
+        self.stop_monitoring()
+        
+        tasks = [
+            task for task in (self._monitor_task, self._stream_task, self._writer_task)
+            if task is not None and task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        if not open_trades:
-            return
+        # The connection belongs to the DB thread, so close it there (after any queued calls)
+        if self._trade_db.conn is not None:
+            await self._db_call(self._trade_db.close)
+        self._db_executor.shutdown(wait=True)
+    
+    def notify_trade_opened(self):
+        """Wake the monitoring loop so a newly opened trade is checked right away"""
+        self._check_now.set()
+    
+    async def _watch_price_stream(self):
+        """
+        Wake the monitoring loop as soon as a streamed price reaches an open trade's SL or TP
         
-        # Get current positions from OANDA
+        Resubscribes whenever a check changes the set of instruments with open trades.
+        """
+        while self.monitoring_active:
+            instruments = sorted(self._exit_levels)
+            self._instruments_changed.clear()
+            
+            if not instruments:
+                await self._instruments_changed.wait()
+                continue
+            
+            stream = self.oanda_client.stream_prices(instruments)
+            try:
+                async for tick in stream:
+                    if not self.monitoring_active or self._instruments_changed.is_set():
+                        break
+                    
+                    if tick is None:
+                        continue
+                    
+                    instrument, bid, ask = tick[:3]
+                    self._queue_tick(instrument, (bid + ask) / 2)
+                    if self._reached_exit_level(instrument, bid, ask):
+                        self._check_now.set()
+            except Exception as e:
+                logger.error("❌ Price stream error: %s", e)
+                await asyncio.sleep(5)
+            finally:
+                await stream.aclose()
+    
+    def _queue_tick(self, instrument: str, mid: float):
+        """Queue a streamed mid price for the DB writer, dropping the oldest tick when full"""
         try:
-            oanda_trades = await self.oanda_client.get_open_trades()
-            oanda_trade_ids = [t['id'] for t in oanda_trades]
+            self._tick_queue.put_nowait((instrument, mid))
+        except asyncio.QueueFull:
+            self._tick_queue.get_nowait()
+            self._tick_queue.put_nowait((instrument, mid))
+    
+    async def _write_streamed_prices(self):
+        """
+        Write streamed prices of open trades to the database in batches
+        
+        A batch is the first queued tick plus whatever else arrives within
+        tick_flush_interval (up to tick_batch_size ticks). Only the latest price per
+        instrument is kept, and the batch is written with one bulk update.
+        """
+        while self.monitoring_active:
+            instrument, mid = await self._tick_queue.get()
+            latest = {instrument: mid}
+            
+            await asyncio.sleep(self.tick_flush_interval)
+            for _ in range(min(self._tick_queue.qsize(), self.tick_batch_size - 1)):
+                instrument, mid = self._tick_queue.get_nowait()
+                latest[instrument] = mid
             
+            still_open = [
+                (trade, price)
+                for instrument, price in latest.items()
+                for trade in self._open_positions.get(instrument, ())
+            ]
+            if still_open:
+                await self._update_trade_statuses(still_open)
+    
+    def _reached_exit_level(self, instrument: str, bid: float, ask: float) -> bool:
+        """Whether the price an open trade would exit at has reached its SL or TP"""
+        for direction, stop_loss, take_profit in self._exit_levels.get(instrument, ()):
+            if direction == 'BUY':
+                if bid <= stop_loss or bid >= take_profit:
+                    return True
+            elif ask >= stop_loss or ask <= take_profit:
+                return True
+        
+        return False
+    
+    def _set_exit_levels(self, exit_levels: Dict):
+        """Replace the watched exit levels, resubscribing the stream if the instruments changed"""
+        if exit_levels.keys() != self._exit_levels.keys():
+            self._instruments_changed.set()
+        self._exit_levels = exit_levels
+    
+    def _poll_interval(self, closest_pips: float) -> float:
+        """Seconds until the next check: short near SL/TP, long when every trade is far away"""
+        return min(max(closest_pips * self.poll_seconds_per_pip, self.min_poll_interval), self.max_poll_interval)
+    
+    async def _monitor_trades(self) -> float:
+        """
+        Monitor all open trades for TP/SL hits
+        
+        Returns:
+            Seconds to wait before the next check
+        """
+        closest_pips = float('inf')
+        
+        try:
+            # Local open trades and current positions from OANDA, fetched together
+            open_trades, oanda_trades = await asyncio.gather(
+                self._db_call(self._trade_db.get_open_trades),
+                self.oanda_client.get_open_trades()
+            )
+            
+            if not open_trades:
+                self._set_exit_levels({})
+                return self.max_poll_interval
+            
+            # OANDA trade ids are strings and open_trades.trade_id is TEXT, so ids
+            # compare as stored - no per-trade conversion
+            oanda_trade_ids = {t['id'] for t in oanda_trades}
+            
+            # One pricing request for every instrument with an open trade
+            instruments = sorted({trade['instrument'] for trade in open_trades})
+            prices = await self.oanda_client.get_current_prices(instruments)
+            for instrument in instruments:
+                if instrument not in self.pip_size:
+                    self.pip_size[instrument] = await self.oanda_client.get_pip_value(instrument)
+            
+            # One pass splits trades into still open / closed by broker, each
+            # as (trade, current_price) pairs. Closed trades take their exit from
+            # OANDA's record, so only still-open trades need a current price
+            still_open = []
+            closed = []
             for trade in open_trades:
-                trade_id = str(trade['trade_id'])
+                current_price = prices.get(trade['instrument'])
+                
+                # +1 BUY / -1 SELL: P&L and exit checks below are sign * (price difference)
+                trade['direction_sign'] = 1 if trade['direction'] == 'BUY' else -1
+                trade['pip_size'] = self.pip_size[trade['instrument']]
                 
                 # Check if trade is still open in OANDA
-                if trade_id not in oanda_trade_ids:
-                    await self._handle_closed_trade(trade)
+                if trade['trade_id'] not in oanda_trade_ids:
+                    closed.append((trade, current_price))
+                elif current_price is None:
+                    logger.warning("❌ No price data for %s", trade['instrument'])
                 else:
-                    # Update current price and unrealized P&L
-                    await self._update_trade_status(trade)
+                    still_open.append((trade, current_price))
+            
+            updates = [self._handle_closed_trade(trade, current_price) for trade, current_price in closed]
+            
+            # Current price and unrealized P&L of every still-open trade in one statement
+            if still_open:
+                updates.append(self._update_trade_statuses(still_open))
+            
+            # Run the updates together; one failing trade doesn't cancel the rest
+            results = await asyncio.gather(*updates, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("❌ Error updating trade: %s", result)
+            
+            exit_levels = {}
+            open_positions = {}
+            for trade, _ in still_open:
+                exit_levels.setdefault(trade['instrument'], []).append(
+                    (trade['direction'], trade['stop_loss'], trade['take_profit'])
+                )
+                open_positions.setdefault(trade['instrument'], []).append(trade)
+            self._open_positions = open_positions
+            self._set_exit_levels(exit_levels)
+            
+            # Distance from price to whichever of SL/TP is nearer, in pips
+            for trade, current_price in still_open:
+                distance = min(abs(current_price - trade['stop_loss']), abs(current_price - trade['take_profit']))
+                closest_pips = min(closest_pips, distance / trade['pip_size'])
                     
         except Exception as e:
-            print(f"❌ Error monitoring trades: {str(e)}")
+            logger.error("❌ Error monitoring trades: %s", e)
+            return 30  # Retry at the old fixed interval
+        
+        return self._poll_interval(closest_pips)
     
-    async def _update_trade_status(self, trade: Dict):
-        """Update trade with current price and unrealized P&L"""
+    async def _update_trade_statuses(self, trades_with_prices: List):
+        """Update trades with current price and unrealized P&L - (trade, current_price) pairs"""
         try:
-            current_price = await self.oanda_client.get_current_price(trade['instrument'])
-            
-            # Calculate unrealized P&L
-            if trade['direction'] == 'BUY':
-                unrealized_pnl = (current_price - trade['entry_price']) * trade['units']
-            else:
-                unrealized_pnl = (trade['entry_price'] - current_price) * trade['units']
-            
-            # Update in database
-            self.db.update_trade_current_price(
-                trade['trade_id'], 
-                current_price, 
-                unrealized_pnl
-            )
+            rows = []
+            for trade, current_price in trades_with_prices:
+                # Calculate unrealized P&L
+                unrealized_pnl = trade['direction_sign'] * (current_price - trade['entry_price']) * trade['units']
+                
+                rows.append((current_price, unrealized_pnl, trade['trade_id']))
+            
+            # Update in database - one executemany, one commit
+            await self._db_call(self._trade_db.update_trade_prices_bulk, rows)
             
         except Exception as e:
-            print(f"❌ Error updating trade status: {str(e)}")
+            logger.error("❌ Error updating trade status: %s", e)
     
-    async def _handle_closed_trade(self, trade: Dict):
-        """Handle a trade that was closed by broker (TP/SL hit)"""
+    async def _handle_closed_trade(self, trade: Dict, current_price: Optional[float]):
+        """
+        Handle a trade that was closed by broker (TP/SL hit)
+        
+        Exit price and reason come from OANDA's record of the trade; current_price
+        (the market price) is only used if that lookup fails. With neither, the
+        trade stays open locally and is retried on the next check.
+        """
         try:
-            # Get exit price
-            current_price = await self.oanda_client.get_current_price(trade['instrument'])
+            try:
+                exit_info = await self.oanda_client.get_closed_trade(trade['trade_id'])
+                exit_price = exit_info['price']
+                exit_reason = exit_info['reason']
+            except Exception as e:
+                if current_price is None:
+                    logger.warning("⚠️ No exit price for closed trade %s yet: %s", trade['trade_id'], e)
+                    return
+                logger.warning("⚠️ Using market price as exit for trade %s: %s", trade['trade_id'], e)
+                exit_price = current_price
+                exit_reason = self._determine_exit_reason(trade, current_price)
             
             # Calculate P&L
-            if trade['direction'] == 'BUY':
-                pnl = (current_price - trade['entry_price']) * trade['units']
-            else:
-                pnl = (trade['entry_price'] - current_price) * trade['units']
-            
-            # Determine exit reason
-            exit_reason = self._determine_exit_reason(trade, current_price)
+            pnl = trade['direction_sign'] * (exit_price - trade['entry_price']) * trade['units']
             
             # Close trade in database
-            self.db.close_trade(
+            await self._db_call(
+                self._trade_db.close_trade,
                 trade_id=trade['trade_id'],
-                exit_price=current_price,
+                exit_price=exit_price,
                 pnl=pnl,
                 exit_reason=exit_reason,
                 exit_time=datetime.now()
@@ -112,27 +359,25 @@ class TradeManager:
             emoji = "🎯" if exit_reason == "TP" else "🛑" if exit_reason == "SL" else "⚠️"
             pnl_emoji = "💰" if pnl > 0 else "📉"
             
-            print(f"{emoji} Trade closed: {trade['instrument']} {trade['direction']}")
-            print(f"   {pnl_emoji} P&L: ${pnl:.2f} | Exit: {exit_reason}")
+            # WARNING so a closed trade is reported even when LOG_LEVEL filters out INFO
+            logger.warning("%s Trade closed: %s %s", emoji, trade['instrument'], trade['direction'])
+            logger.warning("   %s P&L: $%.2f | Exit: %s", pnl_emoji, pnl, exit_reason)
             
         except Exception as e:
-            print(f"❌ Error handling closed trade: {str(e)}")
+            logger.error("❌ Error handling closed trade: %s", e)
     
     def _determine_exit_reason(self, trade: Dict, exit_price: float) -> str:
         """Determine why the trade was closed"""
-        tolerance = 0.0001  # Price tolerance for TP/SL detection
+        tolerance = trade['pip_size'] * 0.5  # Price tolerance for TP/SL detection (half a pip)
+        sign = trade['direction_sign']
         
-        # Check if TP was hit
-        if trade['direction'] == 'BUY':
-            if exit_price >= (trade['take_profit'] - tolerance):
-                return 'TP'
-            elif exit_price <= (trade['stop_loss'] + tolerance):
-                return 'SL'
-        else:  # SELL
-            if exit_price <= (trade['take_profit'] + tolerance):
-                return 'TP'
-            elif exit_price >= (trade['stop_loss'] - tolerance):
-                return 'SL'
+        # Check if TP was hit (at or beyond TP in the trade's favour)
+        if sign * (exit_price - trade['take_profit']) >= -tolerance:
+            return 'TP'
+        
+        # Check if SL was hit (at or beyond SL against the trade)
+        if sign * (trade['stop_loss'] - exit_price) >= -tolerance:
+            return 'SL'
         
         return 'BROKER'  # Closed by broker for other reasons
     
@@ -140,7 +385,7 @@ class TradeManager:
         """Modify stop loss or take profit of an open trade"""
         try:
             # Get trade from database
-            trade = self.db.get_trade_by_id(trade_id)
+            trade = await self._db_call(self._trade_db.get_trade_by_id, trade_id)
             
             if not trade or trade['status'] != 'OPEN':
                 return {'success': False, 'reason': 'Trade not found or not open'}
@@ -168,14 +413,14 @@ class TradeManager:
             if take_profit is not None:
                 updates['take_profit'] = take_profit
             
-            self.db.update_trade(trade_id, updates)
+            await self._db_call(self._trade_db.update_trade, trade_id, updates)
             
-            print(f"✏️ Modified trade {trade_id}: SL={stop_loss}, TP={take_profit}")
+            logger.info("✏️ Modified trade %s: SL=%s, TP=%s", trade_id, stop_loss, take_profit)
             
             return {'success': True, 'message': 'Trade modified successfully'}
             
         except Exception as e:
-            print(f"❌ Error modifying trade: {str(e)}")
+            logger.error("❌ Error modifying trade: %s", e)
             return {'success': False, 'reason': str(e)}
     
     def _validate_stop_loss(self, trade: Dict, new_sl: float) -> bool:
@@ -199,37 +444,34 @@ class TradeManager:
     async def get_trade_performance_summary(self) -> Dict:
         """Get performance summary of all trades"""
         try:
-            closed_trades = self.db.get_closed_trades(limit=1000)
-            open_trades = self.db.get_open_trades()
+            # Aggregated in SQL - only the totals come back
+            closed, opened = await asyncio.gather(
+                self._db_call(self._trade_db.get_closed_trades_summary, limit=1000),
+                self._db_call(self._trade_db.get_open_trades_summary)
+            )
             
-            total_trades = len(closed_trades)
-            winning_trades = len([t for t in closed_trades if t['pnl'] > 0])
+            total_trades = closed['total_trades']
+            winning_trades = closed['winning_trades']
             losing_trades = total_trades - winning_trades
             
-            total_pnl = sum([t['pnl'] for t in closed_trades])
-            
-            # Calculate unrealized P&L
-            unrealized_pnl = sum([t.get('unrealized_pnl', 0) for t in open_trades])
+            total_pnl = closed['total_pnl']
+            unrealized_pnl = opened['unrealized_pnl']
             
             win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
             
-            # Best and worst trades
-            best_trade = max([t['pnl'] for t in closed_trades]) if closed_trades else 0
-            worst_trade = min([t['pnl'] for t in closed_trades]) if closed_trades else 0
-            
             return {
                 'total_trades': total_trades,
-                'open_trades': len(open_trades),
+                'open_trades': opened['open_trades'],
                 'winning_trades': winning_trades,
                 'losing_trades': losing_trades,
                 'win_rate': win_rate,
                 'total_pnl': total_pnl,
                 'unrealized_pnl': unrealized_pnl,
                 'net_pnl': total_pnl + unrealized_pnl,
-                'best_trade': best_trade,
-                'worst_trade': worst_trade
+                'best_trade': closed['best_trade'],
+                'worst_trade': closed['worst_trade']
             }
             
         except Exception as e:
-            print(f"❌ Error getting performance summary: {str(e)}")
+            logger.error("❌ Error getting performance summary: %s", e)
             return {}
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+Trade Signal Module
+Signal record passed from the structure detector through validation to execution
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
+class Signal:
+    """CHOCH/BOS trading signal (slotted: fixed fields, no per-instance dict)"""
+    instrument: str
+    setup_type: str
+    direction: str
+    entry_price: float
+    stop_loss: float
+    reference_level: float
+    swing_break_level: float
+    timestamp: datetime
+    distance_atr_ratio: float = 0.0  # BOS only
+
+    # Filled in by SignalGenerator validation
+    take_profit: Optional[float] = None
+    risk_reward_ratio: Optional[float] = None
+    validated_at: Optional[datetime] = None
@@ -9,14 +9,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from line_chart_config import LINE_CHART_CONFIG
 
+# Config last validated and its result - repeat calls with an unchanged config
+# (e.g. from a healthcheck) return the result without re-printing the report
+_last_config_key = None
+_last_result = None
+
 def validate_configuration():
     """Validate that all fixes are properly applied"""
-    
-    print("VALIDATING BOT CONFIGURATION...")
-    print("=" * 50)
+    global _last_config_key, _last_result
     
     # Check Line Chart Configuration
     config = LINE_CHART_CONFIG.get_config()
+    config_key = tuple(sorted(config.items()))
+    if config_key == _last_config_key:
+        return _last_result
+    
+    print("VALIDATING BOT CONFIGURATION...")
+    print("=" * 50)
     
     print("LINE CHART CONFIGURATION:")
     print(f"   Line Chart Mode: {config['line_chart_mode']}")
@@ -70,6 +79,8 @@ def validate_configuration():
     else:
         print("WARNING: SOME ISSUES FOUND - Check configuration")
     
+    _last_config_key = config_key
+    _last_result = all_good
     return all_good
 
 if __name__ == "__main__":